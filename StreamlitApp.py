@@ -1,16 +1,13 @@
+import os
 from datetime import datetime
+from urllib.parse import urlencode
 
-import pandas as pd
 import streamlit as st
-import plotly.express as px
-import numpy as np
 from streamlit_extras.add_vertical_space import add_vertical_space
-from streamlit_extras.metric_cards import style_metric_cards
 
-from data.lists import country_list, dict_scores, dict_scope
+from data.lists import country_list, dict_metrics, dict_scores, dict_scope, dict_scope_countries
 from utils.general import get_img_with_href
-from utils.load_preprocess_data import load_countries, preprocess_score_table, groupby_scores_time_agg, preprocess_country_table, create_high_low_list
-from utils.viz import load_world_map_TopFlop, load_world_map_fatalities
+from utils.metrics import cache_metrics, function_metrics, instrument, start_exporter
 
 st.set_page_config(
     page_title="OCoDi",
@@ -18,130 +15,189 @@ st.set_page_config(
     layout="wide",
 )
 
+start_exporter()
+
 # Paths to data sources
 path_to_full_scaled = "data/full_scaled.csv"
 path_to_countries_data = "data/countries.csv"
 path_to_predictions = "data/predictions.csv"
 path_to_logo = "data/images/kompzkfe_logo.png"
 
-# Loading the data from sources
+# Base URL of the data API (api.py) as seen from the visitor's browser, if one runs next to the app
+api_url = os.environ.get("OCODI_API_URL")
 
-df_countries = load_countries(path_to_countries_data)
-dict_countries = dict(zip(df_countries.alpha3, df_countries.name))
-df_high_low = create_high_low_list(path_to_full_scaled, dict_countries, year=2022)
-df_highest = df_high_low[df_high_low["Highest_Lowest"]=='highest'].sort_values(by="OCoDi", ascending=False)
-df_lowest = df_high_low[df_high_low["Highest_Lowest"]=='lowest']
-df_predictions = pd.read_csv(path_to_predictions)
-max_fat = df_predictions["predicted_fatalities"].max()
+# Download of a section's current selection, used inside the sections. The file is only written when
+# asked for, chunk by chunk into a temporary file on a background thread, so neither ordinary reruns nor
+# the rerun that starts an export wait for it. Large selections link to the data API instead, which
+# streams them to the browser without going through the session.
+def export_controls(name, file_name, selection, make_chunks, n_rows=0, api_query=None):
+    from utils.export import EXPORT_FORMATS, EXPORT_LINK_ROWS, available_formats, submit_export
 
+    col_format, col_prepare, col_download = st.columns([2, 1, 1])
+    with col_format:
+        fmt = st.radio("Export format",
+                       options=available_formats(),
+                       format_func=str.upper,
+                       horizontal=True,
+                       key=f"{name}_export_format")
+    if api_url and api_query is not None and n_rows >= EXPORT_LINK_ROWS:
+        with col_download:
+            st.link_button("Download", f"{api_url.rstrip('/')}{api_query}&{urlencode({'format': fmt})}")
+        return
+    with col_prepare:
+        if st.button("Prepare download", key=f"{name}_export_prepare"):
+            st.session_state[f"{name}_export"] = (selection, fmt, submit_export(make_chunks, fmt, selection))
+    prepared = st.session_state.get(f"{name}_export")
+    if prepared is None or prepared[:2] != (selection, fmt):
+        return
+    future = prepared[2]
+    with col_download:
+        if not future.done():
+            export_progress(future)
+        elif future.exception() is not None:
+            st.error("The export failed, please try again.")
+        elif os.path.exists(future.result()):
+            with open(future.result(), "rb") as f:
+                st.download_button("Download",
+                                   f,
+                                   file_name=file_name + EXPORT_FORMATS[fmt][1],
+                                   mime=EXPORT_FORMATS[fmt][0],
+                                   key=f"{name}_export_download")
 
-# Front-end part of the app
-sub = st.container()
 
-with sub:
-    st.title("An Interpretable Deep Learning Approach to Domain-Specific Dictionary Creation: A Use Case for Conflict Prediction")
-    st.markdown("**Contributors: <a href='https://www.unibw.de/ciss-en/kompz-kfe/team/sonja-haffner-m-sc' style='text-decoration: none; color: black; font-weight: bold;'>Sonja Häffner</a>, <a href='https://www.unibw.de/ciss-en/kompz-kfe/team/dr-rer-nat-martin-hofer' style='text-decoration: none; color: black; font-weight: bold;'>Martin Hofer</a>, <a href='https://www.uni-regensburg.de/wirtschaftswissenschaften/bwl-roesch/team/maximilian-nagl/index.html' style='text-decoration: none; color: black; font-weight: bold;'>Maximilian Nagl</a>, and <a href='https://www.unibw.de/ciss-en/kompz-kfe/team/julian-walterskirchen-m-sc' style='text-decoration: none; color: black; font-weight: bold;'>Julian Walterskirchen</a>**", unsafe_allow_html=True)
-    st.write(
-        "This website serves as a companion to our paper published in [Political Analysis](https://www.cambridge.org/core/journals/political-analysis). It allows the user to explore different aspects of our **Objective Conflict Dictionary (OCoDi)**. For more details read the paper here: [https://doi.org/10.1017/pan.2023.7](https://doi.org/10.1017/pan.2023.7). The code and data for the paper can be found here: https://doi.org/10.7910/DVN/Y5INRM. We would like to thank Marje Kaack for supporting the development of this web application.")
-    st.subheader("Abstract")
-    st.write("Recent advancements in natural language processing (NLP) methods have significantly improved their performance. However, more complex NLP models are more difficult to interpret and computationally expensive. Therefore, we propose an approach to dictionary creation that carefully balances the trade-off between complexity and interpretability. This approach combines a deep neural network architecture with techniques to improve model explainability to automatically build a domain-specific dictionary. As an illustrative use case of our approach, we create an objective dictionary that can infer conflict intensity from text data. We train the neural networks on a corpus of conflict reports and match them with conflict event data. This corpus consists of over 14,000 expert-written International Crisis Group (ICG) CrisisWatch reports between 2003 and 2021. Sensitivity analysis is used to extract the weighted words from the neural network to build the dictionary. In order to evaluate our approach, we compare our results to state-of-the-art deep learning language models, text-scaling methods, as well as standard, non-specialized, and conflict event dictionary approaches. We are able to show that our approach outperforms other approaches while retaining interpretability.")
+@st.fragment(run_every=1)
+def export_progress(future):
+    # Polls a background export; once it is written the app reruns to show the download button
+    if future.done():
+        st.rerun()
+    st.caption("Writing export...")
 
 
-# Navigation in sidebar to jump to the different topics
-with st.sidebar:
-    img_html = get_img_with_href(path_to_logo, 'https://www.unibw.de/ciss-en/kompz-kfe/')
-    st.markdown(img_html, unsafe_allow_html=True)
-    add_vertical_space(3)
-    st.title("Sections")
-    st.markdown(f'''
-    <a href={'#trends-in-conflict-intensity'}><button style="background-color:White; border: 2px solid black; width: 100%; border-radius:8px; font-site:20px ">Trends in Conflict Intensity</button></a>
-    ''', unsafe_allow_html=True)
-    st.markdown(f'''
-        <a href={'#predicting-fatalities'}><button style="background-color:White; border: 2px solid black; width: 100%; border-radius:8px; font-site:20px ">Predicting Fatalities</button></a>
-        ''', unsafe_allow_html=True)
-    st.markdown(f'''
-        <a href={'#time-series-analysis'}><button style="background-color:White; border: 2px solid black; width: 100%; border-radius:8px; font-site:20px ">Time Series Analysis</button></a>
-        ''', unsafe_allow_html=True)
-    st.markdown(f'''
-            <a href={'#nlp-methods'}><button style="background-color:White; border: 2px solid black; width: 100%; border-radius:8px; font-site:20px ">NLP Methods</button></a>
-            ''', unsafe_allow_html=True)
+# Sections of the page. Each one is a fragment, so interacting with one of its widgets only reruns
+# that section instead of the whole script. pandas/plotly and the data modules are imported inside
+# the sections, so on a cold start the header and abstract render before those imports run.
+@st.fragment
+@instrument(name="section.trends_section")
+def trends_section():
+    from streamlit_extras.metric_cards import style_metric_cards
+    from utils.load_preprocess_data import create_high_low_list, load_ranking_years
+    from utils.viz import get_world_map_TopFlop
 
-# WorldMap of TopFlop countries colored
+    col_year, col_score = st.columns([1, 1])
+    with col_year:
+        sel_year = st.selectbox(
+            "Select a year",
+            options=load_ranking_years(path_to_full_scaled)[::-1]
+        )
+    with col_score:
+        sel_score = st.selectbox(
+            "Select a score",
+            options=list(dict_scores.keys()),
+            index=list(dict_scores.keys()).index("OCoDi"),
+            format_func=lambda x: dict_scores[x]
+        )
 
-# Conflict trends
-st.subheader("Trends in Conflict Intensity")
-st.write("The map below shows the countries with the highest and lowest OCoDi Scores for 2022. These Scores give an indication of how conflictual the reporting by [CrisisWatch](https://www.crisisgroup.org/crisiswatch) was in 2022. In general, higher values are associated with higher levels of fatalities. The highest and lowest OCoDi Scores for 2022 can be explored in the below world map or by clicking on the expandable *List of Trends*.")
-fig_world_map_top_flop = load_world_map_TopFlop(df_high_low,
-                                                "natural earth",
-                                                "world",
-                                                "Highest_Lowest")
-
-st.plotly_chart(fig_world_map_top_flop, use_container_width=True)
-
-# Highest/Lowest OCoDi score country comparison
-with st.expander(label="**List of Trends**"):
-    st.write("Countries with the highest and lowest OCoDi scores averaged over 2022.")
-    add_vertical_space(1)
-    st.write(
-        """
-        <style>
-        [data-testid="stMetricDelta"] svg {
-            display: none;
-        }
-        div[data-testid="stMetric"]
-        </style>
-        """,
-        unsafe_allow_html=True,
-    )
-    # highest and lowest 5 OCoDi Scores in 2022
-    highest, lowest = st.columns(2)
-    with highest:
-        st.markdown('<p style="color:red; font-size:30px"> Most conflictual reporting', unsafe_allow_html=True)
-        for i, row in df_highest.iterrows():
-            st.metric(label = "", value=row["CountryName"], delta='{:.4f}'.format(row['OCoDi']), delta_color="inverse")
-    with lowest:
-        st.markdown('<p style="color:green; font-size:30px"> Least conflictual reporting', unsafe_allow_html=True)
-        for i, row in df_lowest.iterrows():
-            st.metric(label="", value=row["CountryName"], delta='{:.4f}'.format(row['OCoDi']), delta_color="inverse")
-    style_metric_cards()
-add_vertical_space(2)
-# Predicting Fatalities Component
-st.subheader("Predicting Fatalities")
-st.write("In our paper we also assess how well our dictionary can infer conflict related fatalities from documents not used in the training of our dictionary. The dictionary was trained on reports between 2003 and 2020 and was then applied to reports published in 2021 and 2022. The scores obtained for these reports were then used as features in XGBoost models to predict fatalities in 2021 and 2022. These predictions are not true forecasts of the future, but can be viewed as a text regression task. In the world map below one can investigate how much conflict related fatalities our model predicted for each month in 2021 and 2022.")
-sel_scope = st.selectbox(
-    "Select a region",
-    options=list(dict_scope.keys()),
-    format_func=lambda x: dict_scope[x]
-)
+    df_high_low = create_high_low_list(path_to_full_scaled, path_to_countries_data, year=sel_year, score=sel_score)
+    df_highest = df_high_low[df_high_low["Highest_Lowest"]=='highest'].sort_values(by=sel_score, ascending=False)
+    df_lowest = df_high_low[df_high_low["Highest_Lowest"]=='lowest']
+    if df_high_low.empty:
+        st.info(f"No {dict_scores[sel_score]} scores available for {sel_year}.")
+        return
+    fig_world_map_top_flop = get_world_map_TopFlop(path_to_full_scaled,
+                                                   path_to_countries_data,
+                                                   "natural earth",
+                                                   "world",
+                                                   "Highest_Lowest",
+                                                   year=sel_year,
+                                                   score=sel_score)
 
+    st.plotly_chart(fig_world_map_top_flop, use_container_width=True)
 
-# Creation of map of fatality predictions
-fig_world_map_fat = load_world_map_fatalities(df_predictions,
-                                              "predicted_fatalities",
-                                              "natural earth",
-                                              sel_scope,
-                                              "reds",
-                                              dict_countries,
-                                              round(max_fat))
-st.plotly_chart(fig_world_map_fat, use_container_width=True)
+    # Highest/Lowest OCoDi score country comparison
+    with st.expander(label="**List of Trends**"):
+        st.write(f"Countries with the highest and lowest {sel_score} scores averaged over {sel_year}.")
+        add_vertical_space(1)
+        st.write(
+            """
+            <style>
+            [data-testid="stMetricDelta"] svg {
+                display: none;
+            }
+            div[data-testid="stMetric"]
+            </style>
+            """,
+            unsafe_allow_html=True,
+        )
+        # highest and lowest 5 OCoDi Scores in 2022
+        highest, lowest = st.columns(2)
+        with highest:
+            heading = "Most conflictual reporting" if sel_score == "OCoDi" else f"Highest {sel_score}"
+            st.markdown(f'<p style="color:red; font-size:30px"> {heading}', unsafe_allow_html=True)
+            for i, row in df_highest.iterrows():
+                st.metric(label = "", value=row["CountryName"], delta='{:.4f}'.format(row[sel_score]), delta_color="inverse")
+        with lowest:
+            heading = "Least conflictual reporting" if sel_score == "OCoDi" else f"Lowest {sel_score}"
+            st.markdown(f'<p style="color:green; font-size:30px"> {heading}', unsafe_allow_html=True)
+            for i, row in df_lowest.iterrows():
+                st.metric(label="", value=row["CountryName"], delta='{:.4f}'.format(row[sel_score]), delta_color="inverse")
+        style_metric_cards()
 
-add_vertical_space(5)
-#
-st.subheader("Time Series Analysis")
-st.write("To get a more detailed understanding of how well OCoDi captures conflict intensity (log fatalities) in reports, one can compare different countries over time (Country Comparison) or compare scores from different natural language processing (NLP) methods for one country (Score Comparison). More details on the different NLP methods can be found below.")
-timeseries = st.radio("Time Series Comparison",
-                      ("Country Comparison", "Score Comparison"),
-                      index=0,
-                      horizontal=True,
-                      label_visibility="collapsed")
-st.subheader(timeseries)
-if timeseries == "Country Comparison":
+
+@st.fragment
+@instrument(name="section.predictions_section")
+def predictions_section():
+    from utils.data_store import dataset_version
+    from utils.load_preprocess_data import iter_predictions, load_prediction_periods
+    from utils.viz import get_world_map_fatalities
+
+    col_scope, col_period = st.columns([1, 1])
+    with col_scope:
+        sel_scope = st.selectbox(
+            "Select a region",
+            options=list(dict_scope.keys()),
+            format_func=lambda x: dict_scope[x]
+        )
+    with col_period:
+        # Loading one year of frames at a time keeps the map payload small on slow connections
+        sel_period = st.selectbox(
+            "Select a period",
+            options=[None] + load_prediction_periods(path_to_predictions),
+            format_func=lambda x: "All months" if x is None else x
+        )
+
+    # Creation of map of fatality predictions
+    fig_world_map_fat = get_world_map_fatalities(path_to_predictions,
+                                                 path_to_countries_data,
+                                                 "natural earth",
+                                                 sel_scope,
+                                                 "reds",
+                                                 compact=True,
+                                                 period=sel_period)
+    st.plotly_chart(fig_world_map_fat, use_container_width=True)
+
+    export_countries = dict_scope_countries.get(sel_scope)
+    export_start = None if sel_period is None else datetime(int(sel_period), 1, 1)
+    export_end = None if sel_period is None else datetime(int(sel_period), 12, 31)
+    export_controls("predictions",
+                    f"predictions_{sel_scope.replace(' ', '_')}_{sel_period or 'all'}",
+                    ("predictions", dataset_version(path_to_predictions), sel_scope, sel_period),
+                    lambda: iter_predictions(path_to_predictions, export_countries, export_start, export_end))
+
+
+@st.fragment
+@instrument(name="section.country_comparison")
+def country_comparison():
+    from utils.data_store import dataset_version
+    from utils.load_preprocess_data import iter_score_series, load_country_names, select_country_comparison
+    from utils.viz import load_country_comparison
+
+    country_names = load_country_names(path_to_countries_data)
     st.write("Select **countries** to compare, a **score** to analyse and a **time period**.")
     c1, c2 = st.columns([1, 1])
     with c1:
         countryOption = st.multiselect("Select a country",
                                        country_list,
-                                       format_func=lambda x: dict_countries[x.lower()],
+                                       format_func=lambda x: country_names.get(x, x),
                                        default=["NGA"])
     with c2:
         sel_scores = st.selectbox("Select a Score",
@@ -160,35 +216,46 @@ if timeseries == "Country Comparison":
                                   options=("monthly", "yearly"),
                                   horizontal=True)
 
-    df_scores_agg = groupby_scores_time_agg(preprocess_score_table(path_to_full_scaled), sel_agg_period)
-    df_scores_sel = df_scores_agg[
-        (df_scores_agg["iso3"].isin(countryOption)) &
-        (df_scores_agg["DATE"] <= timePeriod[1]) &
-        (df_scores_agg["DATE"] >= timePeriod[0])
-        ]
-    fig = px.line(df_scores_sel,
-                  x="DATE",
-                  y=sel_scores,
-                  color="iso3",
-                  hover_data={
-                      "iso3":False,
-                      "lnFatalities":":.4f"
-                  },
-                  labels={
-                      "iso3": "ISO-Country Code",
-                      "DATE": "Date"
-                  })
+    df_scores_sel, n_points = select_country_comparison(path_to_full_scaled,
+                                                        countryOption,
+                                                        sel_scores,
+                                                        timePeriod[0],
+                                                        timePeriod[1],
+                                                        sel_agg_period)
+    fig = load_country_comparison(df_scores_sel, sel_scores)
     st.plotly_chart(fig, use_container_width=True)
+    if len(df_scores_sel) < n_points:
+        st.caption(f"Showing {len(df_scores_sel):,} of {n_points:,} points, downsampled to keep the shape of each "
+                   "series. Select fewer countries or a shorter time period for full resolution.")
 
+    export_controls("country_comparison",
+                    f"country_comparison_{sel_scores}_{sel_agg_period}",
+                    ("series", dataset_version(path_to_full_scaled), tuple(sorted(countryOption)),
+                     (sel_scores, "lnFatalities"), timePeriod, sel_agg_period),
+                    lambda: iter_score_series(path_to_full_scaled, countryOption, [sel_scores, "lnFatalities"],
+                                              timePeriod[0], timePeriod[1], sel_agg_period),
+                    n_rows=n_points,
+                    api_query="/series?" + urlencode({"countries": ",".join(countryOption),
+                                                      "scores": ",".join(dict.fromkeys([sel_scores, "lnFatalities"])),
+                                                      "start": f"{timePeriod[0]:%Y-%m-%d}",
+                                                      "end": f"{timePeriod[1]:%Y-%m-%d}",
+                                                      "agg": sel_agg_period}))
 
 
-if timeseries == "Score Comparison":
+@st.fragment
+@instrument(name="section.score_comparison")
+def score_comparison():
+    import plotly.express as px
+    from utils.data_store import dataset_version
+    from utils.load_preprocess_data import iter_score_series, load_country_names, preprocess_country_table
+
+    country_names = load_country_names(path_to_countries_data)
     st.write("Select **scores** to compare, a **country** to analyse and a **time period**.")
     col_sel_cnty, col_scores_cnty = st.columns([1, 1])
     with col_sel_cnty:
         countryOption_country = st.selectbox("Select a country",
                                              country_list,
-                                             format_func=lambda x: dict_countries[x.lower()],
+                                             format_func=lambda x: country_names.get(x, x),
                                              index=0)
     with col_scores_cnty:
         sel_scores_country = st.multiselect("Select Scores to compare",
@@ -211,13 +278,8 @@ if timeseries == "Score Comparison":
                                           sel_scores_country,
                                           countryOption_country,
                                           timePeriod_country[0],
-                                          timePeriod_country[1])
-
-    if sel_agg_period_country == "yearly":
-        df_country = df_country.groupby([
-            pd.Grouper(key="SCORE_NAME"),
-            pd.Grouper(key="DATE", freq="Y")]).agg(
-            SCORE_VALUE=pd.NamedAgg(column="SCORE_VALUE", aggfunc=np.mean), ).reset_index()
+                                          timePeriod_country[1],
+                                          sel_agg_period_country)
 
     fig = px.line(df_country,
                   x="DATE",
@@ -232,8 +294,170 @@ if timeseries == "Score Comparison":
                   })
     st.plotly_chart(fig, use_container_width=True)
 
+    export_controls("score_comparison",
+                    f"score_comparison_{countryOption_country}_{sel_agg_period_country}",
+                    ("series", dataset_version(path_to_full_scaled), (countryOption_country,),
+                     tuple(sel_scores_country), timePeriod_country, sel_agg_period_country),
+                    lambda: iter_score_series(path_to_full_scaled, [countryOption_country], sel_scores_country,
+                                              timePeriod_country[0], timePeriod_country[1], sel_agg_period_country))
+
+
+@st.fragment
+@instrument(name="section.time_series_section")
+def time_series_section():
+    timeseries = st.radio("Time Series Comparison",
+                          ("Country Comparison", "Score Comparison"),
+                          index=0,
+                          horizontal=True,
+                          label_visibility="collapsed")
+    st.subheader(timeseries)
+    if timeseries == "Country Comparison":
+        country_comparison()
+    if timeseries == "Score Comparison":
+        score_comparison()
+
+
+@st.fragment
+@instrument(name="section.score_accuracy_section")
+def score_accuracy_section():
+    import plotly.express as px
+    from utils.correlations import COMPARED_SCORES
+    from utils.load_preprocess_data import (load_country_names, load_metric_summary, resolve_country_names,
+                                            select_rolling_metric)
+
+    country_names = load_country_names(path_to_countries_data)
+    col_metric, col_window = st.columns([1, 1])
+    with col_metric:
+        sel_metric = st.radio("Select a metric",
+                              options=list(dict_metrics.keys()),
+                              format_func=lambda x: dict_metrics[x],
+                              horizontal=True)
+    with col_window:
+        sel_window = st.selectbox("Select a window",
+                                  options=[12, 24, 36],
+                                  format_func=lambda x: f"{x} months")
+
+    df_summary = load_metric_summary(path_to_full_scaled, sel_metric)
+    df_summary = df_summary.melt(id_vars="iso3", var_name="SCORE_NAME", value_name="SCORE_VALUE")
+    df_summary["CountryName"] = resolve_country_names(df_summary["iso3"], country_names).to_numpy()
+    fig = px.box(df_summary,
+                 x="SCORE_NAME",
+                 y="SCORE_VALUE",
+                 points="all",
+                 hover_name="CountryName",
+                 hover_data={"SCORE_NAME": False,
+                             "SCORE_VALUE": ":.4f"},
+                 labels={
+                     "SCORE_NAME": "Score Name",
+                     "SCORE_VALUE": f"{dict_metrics[sel_metric]} (whole period)"
+                 })
+    st.plotly_chart(fig, use_container_width=True)
+
+    col_sel_cnty, col_scores_cnty = st.columns([1, 1])
+    with col_sel_cnty:
+        sel_country = st.selectbox("Select a country",
+                                   country_list,
+                                   format_func=lambda x: country_names.get(x, x),
+                                   index=country_list.index("NGA"),
+                                   key="accuracy_country")
+    with col_scores_cnty:
+        sel_scores = st.multiselect("Select Scores to compare",
+                                    options=COMPARED_SCORES,
+                                    format_func=lambda x: dict_scores.get(x, x),
+                                    default=["OCoDi", "HGI4", "ConfliBERT"],
+                                    key="accuracy_scores")
+
+    df_rolling = select_rolling_metric(path_to_full_scaled, sel_country, sel_scores, sel_metric, sel_window)
+    fig = px.line(df_rolling,
+                  x="DATE",
+                  y="SCORE_VALUE",
+                  color="SCORE_NAME",
+                  hover_data={"SCORE_NAME": False,
+                              "SCORE_VALUE": ":.4f"},
+                  labels={
+                      "SCORE_NAME": "Score Name",
+                      "SCORE_VALUE": f"{dict_metrics[sel_metric]} ({sel_window} months)",
+                      "DATE": "Date"
+                  })
+    st.plotly_chart(fig, use_container_width=True)
+
+
+@st.fragment
+def debug_panel():
+    # Hidden unless the page is opened with ?debug=1 or OCODI_DEBUG_PANEL=1 is set
+    import pandas as pd
+
+    with st.expander("Debug metrics"):
+        st.button("Refresh", key="debug_refresh")
+        df_functions = pd.DataFrame(function_metrics()).drop(columns=["buckets"])
+        df_functions["mean ms"] = 1000 * df_functions["seconds"] / df_functions["calls"].where(df_functions["calls"] > 0)
+        st.dataframe(df_functions.sort_values("seconds", ascending=False), hide_index=True)
+        st.dataframe(pd.DataFrame(cache_metrics()), hide_index=True)
+
+
+# Front-end part of the app
+sub = st.container()
+
+with sub:
+    st.title("An Interpretable Deep Learning Approach to Domain-Specific Dictionary Creation: A Use Case for Conflict Prediction")
+    st.markdown("**Contributors: <a href='https://www.unibw.de/ciss-en/kompz-kfe/team/sonja-haffner-m-sc' style='text-decoration: none; color: black; font-weight: bold;'>Sonja Häffner</a>, <a href='https://www.unibw.de/ciss-en/kompz-kfe/team/dr-rer-nat-martin-hofer' style='text-decoration: none; color: black; font-weight: bold;'>Martin Hofer</a>, <a href='https://www.uni-regensburg.de/wirtschaftswissenschaften/bwl-roesch/team/maximilian-nagl/index.html' style='text-decoration: none; color: black; font-weight: bold;'>Maximilian Nagl</a>, and <a href='https://www.unibw.de/ciss-en/kompz-kfe/team/julian-walterskirchen-m-sc' style='text-decoration: none; color: black; font-weight: bold;'>Julian Walterskirchen</a>**", unsafe_allow_html=True)
+    st.write(
+        "This website serves as a companion to our paper published in [Political Analysis](https://www.cambridge.org/core/journals/political-analysis). It allows the user to explore different aspects of our **Objective Conflict Dictionary (OCoDi)**. For more details read the paper here: [https://doi.org/10.1017/pan.2023.7](https://doi.org/10.1017/pan.2023.7). The code and data for the paper can be found here: https://doi.org/10.7910/DVN/Y5INRM. We would like to thank Marje Kaack for supporting the development of this web application.")
+    st.subheader("Abstract")
+    st.write("Recent advancements in natural language processing (NLP) methods have significantly improved their performance. However, more complex NLP models are more difficult to interpret and computationally expensive. Therefore, we propose an approach to dictionary creation that carefully balances the trade-off between complexity and interpretability. This approach combines a deep neural network architecture with techniques to improve model explainability to automatically build a domain-specific dictionary. As an illustrative use case of our approach, we create an objective dictionary that can infer conflict intensity from text data. We train the neural networks on a corpus of conflict reports and match them with conflict event data. This corpus consists of over 14,000 expert-written International Crisis Group (ICG) CrisisWatch reports between 2003 and 2021. Sensitivity analysis is used to extract the weighted words from the neural network to build the dictionary. In order to evaluate our approach, we compare our results to state-of-the-art deep learning language models, text-scaling methods, as well as standard, non-specialized, and conflict event dictionary approaches. We are able to show that our approach outperforms other approaches while retaining interpretability.")
+
+
+# Navigation in sidebar to jump to the different topics
+with st.sidebar:
+    img_html = get_img_with_href(path_to_logo, 'https://www.unibw.de/ciss-en/kompz-kfe/')
+    st.markdown(img_html, unsafe_allow_html=True)
+    add_vertical_space(3)
+    st.title("Sections")
+    st.markdown(f'''
+    <a href={'#trends-in-conflict-intensity'}><button style="background-color:White; border: 2px solid black; width: 100%; border-radius:8px; font-site:20px ">Trends in Conflict Intensity</button></a>
+    ''', unsafe_allow_html=True)
+    st.markdown(f'''
+        <a href={'#predicting-fatalities'}><button style="background-color:White; border: 2px solid black; width: 100%; border-radius:8px; font-site:20px ">Predicting Fatalities</button></a>
+        ''', unsafe_allow_html=True)
+    st.markdown(f'''
+        <a href={'#time-series-analysis'}><button style="background-color:White; border: 2px solid black; width: 100%; border-radius:8px; font-site:20px ">Time Series Analysis</button></a>
+        ''', unsafe_allow_html=True)
+    st.markdown(f'''
+        <a href={'#scores-and-fatalities'}><button style="background-color:White; border: 2px solid black; width: 100%; border-radius:8px; font-site:20px ">Scores and Fatalities</button></a>
+        ''', unsafe_allow_html=True)
+    st.markdown(f'''
+            <a href={'#nlp-methods'}><button style="background-color:White; border: 2px solid black; width: 100%; border-radius:8px; font-site:20px ">NLP Methods</button></a>
+            ''', unsafe_allow_html=True)
+
+# WorldMap of TopFlop countries colored
+
+# Conflict trends
+st.subheader("Trends in Conflict Intensity")
+st.write("The map below shows the countries with the highest and lowest OCoDi Scores for 2022 (other years and scores can be selected above the map). These Scores give an indication of how conflictual the reporting by [CrisisWatch](https://www.crisisgroup.org/crisiswatch) was in 2022. In general, higher values are associated with higher levels of fatalities. The highest and lowest OCoDi Scores for 2022 can be explored in the below world map or by clicking on the expandable *List of Trends*.")
+trends_section()
+add_vertical_space(2)
+# Predicting Fatalities Component
+st.subheader("Predicting Fatalities")
+st.write("In our paper we also assess how well our dictionary can infer conflict related fatalities from documents not used in the training of our dictionary. The dictionary was trained on reports between 2003 and 2020 and was then applied to reports published in 2021 and 2022. The scores obtained for these reports were then used as features in XGBoost models to predict fatalities in 2021 and 2022. These predictions are not true forecasts of the future, but can be viewed as a text regression task. In the world map below one can investigate how much conflict related fatalities our model predicted for each month in 2021 and 2022.")
+predictions_section()
+
+add_vertical_space(5)
+#
+st.subheader("Time Series Analysis")
+st.write("To get a more detailed understanding of how well OCoDi captures conflict intensity (log fatalities) in reports, one can compare different countries over time (Country Comparison) or compare scores from different natural language processing (NLP) methods for one country (Score Comparison). More details on the different NLP methods can be found below.")
+time_series_section()
+
+add_vertical_space(5)
+st.subheader("Scores and Fatalities")
+st.write("How closely do the scores follow conflict intensity? For every country, the box plot shows the correlation of each score with log fatalities over the whole period (or the error of log fatalities predicted from the score by a linear fit). The chart below shows the same metric over a rolling window of months for one country.")
+score_accuracy_section()
+
 
 st.subheader("NLP Methods")
 st.write("In order to compare the performance of our OCoDi score to other common NLP methods, we also calculate alternative (sentiment) scores employing the following methods: First, we calculate sentiment scores for each document based on two popular sentiment dictionaries: The [Harvard IV-4 dictionary](https://pypi.org/project/pysentiment2/) and [Valence Aware Dictionary and sEntiment Reasoner - VADER ](https://github.com/cjhutto/vaderSentiment)"
          ". We also analyze our text data with the [PETRARCH2](https://github.com/openeventdata/petrarch2) system that employs the conflict-specific CAMEO and TABARI event extraction dictionaries and use the CAMEO conflict-cooperation scale to assign scores to each text. Next, we rely on two different document scaling techniques ([Wordscores](https://www.tcd.ie/Political_Science/wordscores/index.html) and [Wordfish](http://www.wordfish.org/)) "
-         "to infer relative document positions from our evaluation corpus. We also fine-tune a [ConfliBERT](https://github.com/eventdata/ConfliBERT) model on CrisisWatch reports and then directly predict fatalities for the test data. All scores as described above are calculated at the country-month level and matched with monthly aggregated fatalities from the [UCDP GED database](https://ucdp.uu.se/).  ")
\ No newline at end of file
+         "to infer relative document positions from our evaluation corpus. We also fine-tune a [ConfliBERT](https://github.com/eventdata/ConfliBERT) model on CrisisWatch reports and then directly predict fatalities for the test data. All scores as described above are calculated at the country-month level and matched with monthly aggregated fatalities from the [UCDP GED database](https://ucdp.uu.se/).  ")
+
+if st.query_params.get("debug") == "1" or os.environ.get("OCODI_DEBUG_PANEL") == "1":
+    with st.sidebar:
+        debug_panel()
@@ -0,0 +1,183 @@
+import hashlib
+import io
+import json
+import os
+from datetime import datetime
+
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+import numpy as np
+import pandas as pd
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
+
+from data.lists import country_list
+from utils.aggregates import AGG_LEVELS, AGG_STATS
+from utils.data_store import dataset_version
+from utils.export import EXPORT_FORMATS, iter_export
+from utils.load_preprocess_data import (SCORE_TABLE_COLUMNS, create_high_low_list, iter_predictions, iter_score_series,
+                                        normalize_query, select_predictions, select_score_aggregates,
+                                        select_score_series)
+from utils.metrics import CONTENT_TYPE, prometheus_text
+
+# Read-only HTTP API over the same loaders as the Streamlit app. Run it next to the app, e.g.
+#   uvicorn api:app --workers 4
+# Every list parameter accepts comma-separated values, so one request can cover many countries x scores.
+
+path_to_full_scaled = "data/full_scaled.csv"
+path_to_countries_data = "data/countries.csv"
+path_to_predictions = "data/predictions.csv"
+
+ARROW_MEDIA_TYPE = "application/vnd.apache.arrow.stream"
+
+app = FastAPI(title="OCoDi data API")
+
+
+def _split(values, allowed, name):
+    # Comma-separated and/or repeated query values; no value selects everything
+    items = [item.strip() for value in values for item in value.split(",") if item.strip()]
+    unknown = sorted(set(items) - set(allowed))
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown {name}: {', '.join(unknown)}")
+    return items or None
+
+
+def _date(value, name):
+    # Only calendar dates: pd.Timestamp would also take "", "now" or timestamps with a time zone
+    if value is None:
+        return None
+    for date_format in ("%Y-%m-%d", "%Y-%m"):
+        try:
+            return pd.Timestamp(datetime.strptime(value, date_format))
+        except ValueError:
+            pass
+    raise HTTPException(status_code=400, detail=f"Invalid {name} '{value}', expected YYYY-MM or YYYY-MM-DD")
+
+
+def _choice(value, allowed, name):
+    if value not in allowed:
+        raise HTTPException(status_code=400, detail=f"Invalid {name} '{value}', expected one of {list(allowed)}")
+    return value
+
+
+def _columnar_json(df, version):
+    columns = {}
+    for column in df.columns:
+        values = df[column]
+        if pd.api.types.is_datetime64_any_dtype(values):
+            columns[column] = values.dt.strftime("%Y-%m-%d").tolist()
+        elif pd.api.types.is_float_dtype(values):
+            values = values.to_numpy(dtype="float64")
+            columns[column] = np.where(np.isnan(values), None, values).tolist()
+        else:
+            columns[column] = values.tolist()
+    return {"dataset_version": version, "n_rows": len(df), "columns": columns}
+
+
+def _arrow(df):
+    import pyarrow as pa
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, table.schema) as writer:
+        writer.write_table(table)
+    return sink.getvalue()
+
+
+def _respond(request, response_format, paths, query, build, chunks=None):
+    # ETag from the dataset version(s) and the parsed query in canonical form (the one the query caches
+    # use: sorted unique countries, scores in column order, month-aligned dates), so equivalent requests
+    # share it; a matching If-None-Match skips the work. CSV and Parquet are streamed from chunks() one
+    # chunk at a time instead of building the full result.
+    version = "-".join(dataset_version(path)[:8] for path in paths)
+    canonical = repr(sorted(dict(query, format=response_format).items()))
+    etag = f'W/"{version}-{hashlib.sha1(f"{request.url.path}?{canonical}".encode()).hexdigest()[:16]}"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag in [tag.strip() for tag in request.headers.get("if-none-match", "").split(",")]:
+        return Response(status_code=304, headers=headers)
+    if response_format in EXPORT_FORMATS:
+        media_type, suffix = EXPORT_FORMATS[response_format]
+        headers["Content-Disposition"] = f'attachment; filename="{request.url.path.strip("/")}{suffix}"'
+        return StreamingResponse(iter_export(chunks(), response_format), media_type=media_type, headers=headers)
+    df = build()
+    if response_format == "arrow":
+        return Response(content=_arrow(df), media_type=ARROW_MEDIA_TYPE, headers=headers)
+    return Response(content=json.dumps(_columnar_json(df, version)), media_type="application/json",
+                    headers=headers)
+
+
+@app.get("/metrics")
+def metrics():
+    # Per worker process: with several uvicorn workers each scrape sees the worker that answered
+    return Response(content=prometheus_text(), media_type=CONTENT_TYPE)
+
+
+@app.get("/version")
+def version():
+    return {"full_scaled": dataset_version(path_to_full_scaled),
+            "predictions": dataset_version(path_to_predictions),
+            "countries": dataset_version(path_to_countries_data)}
+
+
+@app.get("/series")
+def series(request: Request,
+           countries: list[str] = Query(default=[]),
+           scores: list[str] = Query(default=[]),
+           start: str | None = None,
+           end: str | None = None,
+           agg: str = "monthly",
+           format: str = "json"):
+    query = normalize_query({"countries": _split(countries, country_list, "countries") or list(country_list),
+                             "list_scores": _split(scores, SCORE_TABLE_COLUMNS, "scores") or SCORE_TABLE_COLUMNS,
+                             "start_date": _date(start, "start"), "end_date": _date(end, "end"),
+                             "agg_period": _choice(agg, AGG_LEVELS, "agg")})
+    _choice(format, ("json", "arrow", *EXPORT_FORMATS), "format")
+    return _respond(request, format, [path_to_full_scaled], query,
+                    lambda: select_score_series(path_to_full_scaled, **query),
+                    lambda: iter_score_series(path_to_full_scaled, **query))
+
+
+@app.get("/aggregates")
+def aggregates(request: Request,
+               countries: list[str] = Query(default=[]),
+               scores: list[str] = Query(default=[]),
+               start: str | None = None,
+               end: str | None = None,
+               agg: str = "yearly",
+               stat: str = "mean",
+               format: str = "json"):
+    query = normalize_query({"countries": _split(countries, country_list, "countries") or list(country_list),
+                             "list_scores": _split(scores, SCORE_TABLE_COLUMNS, "scores") or SCORE_TABLE_COLUMNS,
+                             "start_date": _date(start, "start"), "end_date": _date(end, "end"),
+                             "agg_period": _choice(agg, AGG_LEVELS, "agg"), "stat": _choice(stat, AGG_STATS, "stat")})
+    _choice(format, ("json", "arrow"), "format")
+    return _respond(request, format, [path_to_full_scaled], query,
+                    lambda: select_score_aggregates(path_to_full_scaled, **query))
+
+
+@app.get("/rankings")
+def rankings(request: Request,
+             year: int = 2022,
+             n: int = Query(default=5, ge=1, le=50),
+             score: str = "OCoDi",
+             stat: str = "mean",
+             format: str = "json"):
+    query = {"year": year, "n": n, "score": _choice(score, SCORE_TABLE_COLUMNS, "score"),
+             "stat": _choice(stat, AGG_STATS, "stat")}
+    _choice(format, ("json", "arrow"), "format")
+    return _respond(request, format, [path_to_full_scaled, path_to_countries_data], query,
+                    lambda: create_high_low_list(path_to_full_scaled, path_to_countries_data, **query))
+
+
+@app.get("/predictions")
+def predictions(request: Request,
+                countries: list[str] = Query(default=[]),
+                start: str | None = None,
+                end: str | None = None,
+                format: str = "json"):
+    query = normalize_query({"countries": _split(countries, country_list, "countries"),
+                             "start_date": _date(start, "start"), "end_date": _date(end, "end")})
+    _choice(format, ("json", "arrow", *EXPORT_FORMATS), "format")
+    return _respond(request, format, [path_to_predictions], query,
+                    lambda: select_predictions(path_to_predictions, **query),
+                    lambda: iter_predictions(path_to_predictions, **query))
@@ -0,0 +1,113 @@
+import argparse
+import http.client
+import os
+import random
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlencode
+
+from data.lists import country_list, dict_scores
+
+# Load generator for the data API: many concurrent clients issuing batched country x score queries,
+# once without and once with conditional requests (If-None-Match), so the 304 path can be compared
+# against full responses. Starts its own uvicorn unless --url points at a running server.
+# Run from the project root: python -m benchmarks.bench_api
+
+AGGREGATIONS = ["monthly", "quarterly", "yearly"]
+
+
+def random_queries(n_queries, batch_size, seed):
+    rng = random.Random(seed)
+    queries = []
+    for _ in range(n_queries):
+        params = {"countries": ",".join(rng.sample(country_list, batch_size)),
+                  "scores": ",".join(rng.sample(list(dict_scores), rng.randint(1, len(dict_scores)))),
+                  "agg": rng.choice(AGGREGATIONS)}
+        queries.append(f"/series?{urlencode(params)}")
+    return queries
+
+
+def client(host, port, paths, conditional, etags, latencies, statuses):
+    conn = http.client.HTTPConnection(host, port, timeout=60)
+    for path in paths:
+        headers = {"If-None-Match": etags[path]} if conditional and path in etags else {}
+        t0 = time.perf_counter()
+        conn.request("GET", path, headers=headers)
+        response = conn.getresponse()
+        response.read()
+        latencies.append((time.perf_counter() - t0) * 1000)
+        statuses.append(response.status)
+        etags.setdefault(path, response.getheader("ETag"))
+    conn.close()
+
+
+def run(host, port, queries, n_clients, n_requests, conditional, etags):
+    latencies, statuses = [], []
+    threads = []
+    for i in range(n_clients):
+        paths = [queries[(i + j) % len(queries)] for j in range(n_requests)]
+        threads.append(threading.Thread(target=client,
+                                        args=(host, port, paths, conditional, etags, latencies, statuses)))
+    t0 = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - t0
+    latencies.sort()
+    label = "conditional" if conditional else "unconditional"
+    print(f"{label:<14} requests={len(latencies):<6} req/s={len(latencies) / elapsed:8.1f}  "
+          f"p50={statistics.median(latencies):7.1f} ms  p95={latencies[int(len(latencies) * 0.95)]:7.1f} ms  "
+          f"304s={statuses.count(304)}")
+
+
+def wait_for_server(host, port, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            conn = http.client.HTTPConnection(host, port, timeout=5)
+            conn.request("GET", "/version")
+            conn.getresponse().read()
+            return
+        except OSError:
+            time.sleep(0.5)
+    raise RuntimeError(f"API did not come up on {host}:{port}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput and latency of the data API under concurrent load")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--external", action="store_true", help="use an already running server")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=50, help="requests per client")
+    parser.add_argument("--queries", type=int, default=40, help="distinct queries shared by the clients")
+    parser.add_argument("--batch-size", type=int, default=10, help="countries per query")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    server = None
+    if not args.external:
+        server = subprocess.Popen([sys.executable, "-m", "uvicorn", "api:app", "--host", args.host,
+                                   "--port", str(args.port), "--workers", str(args.workers), "--log-level", "warning"],
+                                  env=dict(os.environ, STREAMLIT_LOGGER_LEVEL="error"))
+    try:
+        wait_for_server(args.host, args.port)
+        queries = random_queries(args.queries, args.batch_size, args.seed)
+        etags = {}
+        # Warm every worker's loaders before measuring
+        run(args.host, args.port, queries, args.workers, len(queries), False, {})
+        run(args.host, args.port, queries, args.clients, args.requests, False, etags)
+        run(args.host, args.port, queries, args.clients, args.requests, True, etags)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import os
+import random
+import resource
+from datetime import datetime, timedelta
+
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+from data.lists import country_list, dict_scores
+from utils.load_preprocess_data import preprocess_country_table, select_score_series
+
+# Memory held by the query caches under many users moving the Time Series sliders. Every query uses a
+# new random day-resolution range; key normalization maps them onto month ranges and the byte budgets
+# cap what is kept. Run from the project root: python -m benchmarks.bench_cache_growth
+
+
+def random_query(rng):
+    start = datetime(2003, 8, 31) + timedelta(days=rng.randint(0, 6600))
+    end = start + timedelta(days=rng.randint(0, 6600))
+    return (rng.choice(country_list), rng.sample(list(dict_scores), rng.randint(1, 3)), start, end,
+            rng.choice(["monthly", "yearly"]))
+
+
+def report(n_queries, functions):
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    for func in functions:
+        cache = func.cache
+        lookups = cache.hits + cache.misses
+        print(f"queries={n_queries:<7} {func.__name__:<26} entries={len(cache.entries):<6} "
+              f"bytes={cache.total_bytes / 2 ** 20:7.1f} MiB (budget {cache.max_bytes / 2 ** 20:.0f} MiB)  "
+              f"hit rate={cache.hits / max(lookups, 1):6.1%}  evictions={cache.evictions:<6} max RSS={rss:7.1f} MiB")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Query cache size and hit rate under random slider moves")
+    parser.add_argument("--path", default="data/full_scaled.csv")
+    parser.add_argument("--queries", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    checkpoints = {args.queries // 10, args.queries // 2, args.queries}
+    for i in range(1, args.queries + 1):
+        country, scores, start, end, agg_period = random_query(rng)
+        preprocess_country_table(args.path, scores, country, start, end, agg_period)
+        select_score_series(args.path, [country, rng.choice(country_list)], scores + ["lnFatalities"], start, end,
+                            agg_period)
+        if i in checkpoints:
+            report(i, [preprocess_country_table, select_score_series])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import argparse
+import os
+import time
+import warnings
+
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+from data.lists import country_list
+from utils.load_preprocess_data import MAX_LINE_POINTS, select_country_comparison
+from utils.resources import clear_shared_resources
+from utils.viz import load_country_comparison
+
+# Points, payload size and build time of the Country Comparison chart with all countries selected, at full
+# resolution and downsampled with either method, cold and with the decimated series cached.
+# Run from the project root: python -m benchmarks.bench_country_comparison
+
+
+def measure(path, score, agg_period, max_points, method):
+    t0 = time.perf_counter()
+    df, n_points = select_country_comparison(path, country_list, score, agg_period=agg_period,
+                                             max_points=max_points, method=method)
+    select_s = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    fig = load_country_comparison(df, score)
+    payload = fig.to_json()
+    figure_s = time.perf_counter() - t0
+    return len(df), n_points, fig.data[0].type if fig.data else "-", len(payload), select_s, figure_s
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Country Comparison chart with all countries selected")
+    parser.add_argument("--path", default="data/full_scaled.csv")
+    parser.add_argument("--score", default="OCoDi")
+    parser.add_argument("--agg-period", default="monthly")
+    args = parser.parse_args()
+    warnings.simplefilter("ignore", FutureWarning)
+
+    modes = [("full resolution", float("inf"), "lttb"), ("lttb", MAX_LINE_POINTS, "lttb"),
+             ("minmax", MAX_LINE_POINTS, "minmax")]
+    for name, max_points, method in modes:
+        for state in ("cold", "warm"):
+            if state == "cold":
+                clear_shared_resources()
+                select_country_comparison(args.path, country_list[:1], args.score, agg_period=args.agg_period)
+            rows, n_points, trace, size, select_s, figure_s = measure(args.path, args.score, args.agg_period,
+                                                                      max_points, method)
+            print(f"{name:<16} {state:<5} points={rows:>6}/{n_points:<6} trace={trace:<10} "
+                  f"payload={size / 2 ** 20:6.2f} MiB  select={select_s * 1000:7.1f} ms  "
+                  f"figure+json={figure_s * 1000:7.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
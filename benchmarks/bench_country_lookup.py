@@ -0,0 +1,76 @@
+import argparse
+import os
+import random
+import time
+from datetime import datetime
+
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+import numpy as np
+import pandas as pd
+
+from data.lists import country_list, dict_scores
+from utils.data_store import load_score_index
+
+# Microbenchmark of the Score Comparison lookup under repeated slider moves.
+# Run from the project root: python -m benchmarks.bench_country_lookup
+
+
+def legacy_country_table(temp_path, list_scores, country, start_date, end_date):
+    df_country = pd.read_csv(temp_path)
+    df_country["DATE"] = pd.to_datetime(df_country["yearmon"])
+    df_country_sel = df_country[
+        (df_country["iso3"] == country) &
+        (df_country["DATE"] <= end_date) &
+        (df_country["DATE"] >= start_date)
+        ]
+    df_country_sel = df_country_sel.drop(columns=["yearmon", "year", "month"])
+    df_country_sel = df_country_sel.melt(id_vars=["DATE", "iso3"],
+                                         var_name="SCORE_NAME",
+                                         value_name="SCORE_VALUE")
+    return df_country_sel[df_country_sel["SCORE_NAME"].isin(list_scores)]
+
+
+def slider_moves(n_moves, seed):
+    # Every move picks a new (country, score list, start, end) combination, i.e. a cache miss
+    rng = random.Random(seed)
+    months = pd.date_range(datetime(2003, 8, 31), datetime(2021, 12, 31), freq="D")
+    for _ in range(n_moves):
+        start, end = sorted(rng.sample(range(len(months)), 2))
+        scores = rng.sample(list(dict_scores), rng.randint(1, len(dict_scores)))
+        yield rng.choice(country_list), scores, months[start].to_pydatetime(), months[end].to_pydatetime()
+
+
+def time_moves(func, moves):
+    timings = []
+    for country, scores, start, end in moves:
+        t0 = time.perf_counter()
+        func(country, scores, start, end)
+        timings.append(time.perf_counter() - t0)
+    return np.array(timings) * 1000
+
+
+def report(label, timings):
+    print(f"{label:<10} n={len(timings):<5} mean={timings.mean():8.3f} ms  "
+          f"p50={np.percentile(timings, 50):8.3f} ms  p95={np.percentile(timings, 95):8.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score Comparison lookup latency per slider move")
+    parser.add_argument("--path", default="data/full_scaled.csv")
+    parser.add_argument("--moves", type=int, default=500)
+    parser.add_argument("--legacy-moves", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    index = load_score_index(args.path)
+    print(f"index build: {(time.perf_counter() - t0) * 1000:.1f} ms (one-off per dataset version)")
+
+    report("legacy", time_moves(lambda *q: legacy_country_table(args.path, q[1], q[0], q[2], q[3]),
+                                slider_moves(args.legacy_moves, args.seed)))
+    report("indexed", time_moves(lambda *q: index.country_scores(*q), slider_moves(args.moves, args.seed)))
+
+
+if __name__ == "__main__":
+    main()
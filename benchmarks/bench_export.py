@@ -0,0 +1,97 @@
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+from benchmarks.synthetic import generate_datasets
+from utils.build_mmap import build
+from utils.data_store import load_score_index
+from utils.export import available_formats, export_file
+from utils.load_preprocess_data import SCORE_TABLE_COLUMNS, iter_score_series, select_score_series
+
+# Time and memory of an all-country, all-score export, written chunk by chunk from the index (what the
+# app and API do) vs. built as one frame and serialized at once. Every export runs in a fresh process
+# that opens the memory-mapped store (written by utils.build_mmap, so loading allocates neither Arrow
+# buffers nor a parsed copy), then exports once under tracemalloc and once timed (tracemalloc slows
+# allocation-heavy code down). Memory is the traced peak plus the peak of Arrow's memory pool, whose
+# buffers tracemalloc does not see.
+# Run from the project root: python -m benchmarks.bench_export --scales 1 10
+
+
+def in_memory(path, fmt, agg_period, out_path):
+    df = select_score_series(path, list(load_score_index(path).blocks), SCORE_TABLE_COLUMNS, agg_period=agg_period)
+    if fmt == "csv":
+        df.to_csv(out_path, index=False, date_format="%Y-%m-%d")
+    else:
+        df.to_parquet(out_path, index=False)
+
+
+def streamed(path, fmt, agg_period, out_path):
+    countries = list(load_score_index(path).blocks)
+    written = export_file(lambda: iter_score_series(path, countries, SCORE_TABLE_COLUMNS, agg_period=agg_period),
+                          fmt, (path, agg_period, time.time()))
+    os.replace(written, out_path)
+
+
+def arrow_peak():
+    try:
+        import pyarrow as pa
+    except ImportError:
+        return 0
+    return pa.default_memory_pool().max_memory() or 0
+
+
+def child(path, fmt, agg_period, mode, out_path):
+    load_score_index(path)
+    export = {"in memory": in_memory, "streamed": streamed}[mode]
+    tracemalloc.start()
+    export(path, fmt, agg_period, out_path)
+    peak = tracemalloc.get_traced_memory()[1] + arrow_peak()
+    tracemalloc.stop()
+    t0 = time.perf_counter()
+    export(path, fmt, agg_period, out_path)
+    seconds = time.perf_counter() - t0
+    print(json.dumps({"seconds": seconds, "peak": peak}))
+
+
+def measure(path, fmt, agg_period, mode, out_path):
+    result = subprocess.run([sys.executable, "-m", "benchmarks.bench_export", "--child", path, fmt, agg_period, mode,
+                             out_path], capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Streamed vs. in-memory export of all countries and scores")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10])
+    parser.add_argument("--agg-period", default="monthly")
+    parser.add_argument("--child", nargs=5, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    work_dir = tempfile.mkdtemp(prefix="ocodi-bench-")
+    try:
+        for scale in args.scales:
+            paths = generate_datasets(os.path.join(work_dir, f"x{scale:g}"), scale)
+            build(paths["full_scaled"], paths["predictions"], paths["countries"])
+            for fmt in available_formats():
+                for mode in ("in memory", "streamed"):
+                    out_path = os.path.join(work_dir, f"export.{fmt}")
+                    result = measure(paths["full_scaled"], fmt, args.agg_period, mode, out_path)
+                    print(f"x{scale:<5g} {fmt:<8} {mode:<10} time={result['seconds'] * 1000:8.1f} ms  "
+                          f"peak memory={result['peak'] / 2 ** 20:7.1f} MiB  "
+                          f"file={os.path.getsize(out_path) / 2 ** 20:7.1f} MiB")
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
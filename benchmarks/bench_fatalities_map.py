@@ -0,0 +1,61 @@
+import argparse
+import gzip
+import json
+import os
+import time
+
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+import pandas as pd
+import plotly.utils
+
+from utils.load_preprocess_data import load_country_names
+from utils.viz import load_world_map_fatalities, load_world_map_fatalities_compact
+
+# Payload size and server-side time to first byte of the predicted-fatalities map, legacy px.choropleth
+# animation vs. the compact z-only frames. The serialization step mirrors what st.plotly_chart does
+# for every rerun. Run from the project root: python -m benchmarks.bench_fatalities_map
+
+
+def serialize(fig):
+    return json.dumps(fig.to_dict(), cls=plotly.utils.PlotlyJSONEncoder)
+
+
+def measure(label, build, repeat):
+    t0 = time.perf_counter()
+    fig = build()
+    build_ms = (time.perf_counter() - t0) * 1000
+    serialize_ms = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        payload = serialize(fig)
+        serialize_ms.append((time.perf_counter() - t0) * 1000)
+    serialize_ms = sorted(serialize_ms)[len(serialize_ms) // 2]
+    n_frames = len(fig.frames)
+    print(f"{label:<22} frames={n_frames:<3} payload={len(payload) / 1024:8.1f} KiB  "
+          f"gzip={len(gzip.compress(payload.encode())) / 1024:7.1f} KiB  build={build_ms:7.1f} ms  "
+          f"serialize={serialize_ms:6.1f} ms  server total={build_ms + serialize_ms:7.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Predicted-fatalities map payload benchmark")
+    parser.add_argument("--predictions", default="data/predictions.csv")
+    parser.add_argument("--countries", default="data/countries.csv")
+    parser.add_argument("--scope", default="world")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    df_predictions = pd.read_csv(args.predictions)
+    country_names = load_country_names(args.countries)
+    max_fat = round(df_predictions["predicted_fatalities"].max())
+    map_args = (df_predictions, "predicted_fatalities", "natural earth", args.scope, "reds", country_names, max_fat)
+
+    measure("px animation", lambda: load_world_map_fatalities(*map_args), args.repeat)
+    measure("compact, all months", lambda: load_world_map_fatalities_compact(*map_args), args.repeat)
+    for period in sorted(df_predictions["yearmon"].str[:4].unique()):
+        measure(f"compact, {period}", lambda: load_world_map_fatalities_compact(*map_args, period=period),
+                args.repeat)
+
+
+if __name__ == "__main__":
+    main()
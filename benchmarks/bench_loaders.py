@@ -0,0 +1,183 @@
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+import numpy as np
+import pandas as pd
+import plotly
+
+from benchmarks.synthetic import generate_datasets
+from utils.data_store import CACHE_DIR_NAME
+from utils.load_preprocess_data import (create_high_low_list, groupby_scores_time_agg, load_country_names,
+                                        preprocess_country_table, preprocess_score_table)
+from utils.resources import clear_shared_resources
+from utils.viz import load_world_map_fatalities, load_world_map_fatalities_compact, load_world_map_TopFlop
+
+# Time and memory profile of the loaders and figure builders on synthetic datasets scaled up from the
+# real ones. Every function is measured cold (in-memory and on-disk caches emptied first), warm
+# (repeated calls) and for peak Python heap during a cold call (tracemalloc, which includes numpy and
+# pandas buffers). Results go to a JSON report; pass an older report with --compare to see ratios.
+# Run from the project root: python -m benchmarks.bench_loaders --scales 1 10 100
+
+REGRESSION_RATIO = 1.5
+# Timings below this difference are within run-to-run noise and never flagged
+NOISE_FLOOR_S = 0.005
+
+
+def targets(paths):
+    # (name, prepare, call): prepare runs untimed and returns the arguments of call
+    full, predictions, countries = paths["full_scaled"], paths["predictions"], paths["countries"]
+
+    def last_year():
+        return int(pd.read_csv(full, usecols=["year"])["year"].max())
+
+    def first_country():
+        return str(pd.read_csv(full, usecols=["iso3"], nrows=1)["iso3"].iloc[0])
+
+    def fatalities_args():
+        df_predictions = pd.read_csv(predictions)
+        return (df_predictions, "predicted_fatalities", "natural earth", "world", "reds",
+                load_country_names(countries), round(df_predictions["predicted_fatalities"].max()))
+
+    def top_flop_args():
+        return (create_high_low_list(full, countries, year=last_year()), "natural earth", "world", "Highest_Lowest")
+
+    return [
+        ("create_high_low_list", lambda: (full, countries, last_year()),
+         lambda *args: create_high_low_list(*args)),
+        ("preprocess_score_table", lambda: (full,), preprocess_score_table),
+        ("preprocess_country_table[monthly]", lambda: (full, ["OCoDi", "lnFatalities"], first_country(), None, None),
+         lambda *args: preprocess_country_table(*args, agg_period="monthly")),
+        ("preprocess_country_table[yearly]", lambda: (full, ["OCoDi", "lnFatalities"], first_country(), None, None),
+         lambda *args: preprocess_country_table(*args, agg_period="yearly")),
+        ("groupby_scores_time_agg[yearly]", lambda: (full,), lambda path: groupby_scores_time_agg(path, "yearly")),
+        ("groupby_scores_time_agg[quarterly]", lambda: (full,),
+         lambda path: groupby_scores_time_agg(path, "quarterly")),
+        ("load_world_map_fatalities", fatalities_args, load_world_map_fatalities),
+        ("load_world_map_fatalities_compact", fatalities_args, load_world_map_fatalities_compact),
+        ("load_world_map_TopFlop", top_flop_args, load_world_map_TopFlop),
+    ]
+
+
+def reset_caches(paths):
+    clear_shared_resources()
+    shutil.rmtree(os.path.join(os.path.dirname(paths["full_scaled"]), CACHE_DIR_NAME), ignore_errors=True)
+    gc.collect()
+
+
+def result_size(result):
+    if isinstance(result, pd.DataFrame):
+        return {"result_rows": len(result), "result_bytes": int(result.memory_usage(deep=True).sum())}
+    if isinstance(result, plotly.graph_objects.Figure):
+        return {"result_frames": len(result.frames), "result_traces": len(result.data)}
+    return {}
+
+
+def measure(paths, name, prepare, call, repeat):
+    reset_caches(paths)
+    args = prepare()
+    reset_caches(paths)
+    t0 = time.perf_counter()
+    result = call(*args)
+    cold = time.perf_counter() - t0
+
+    warm = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        call(*args)
+        warm.append(time.perf_counter() - t0)
+
+    reset_caches(paths)
+    tracemalloc.start()
+    call(*args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"function": name, "cold_s": cold, "warm_median_s": statistics.median(warm), "warm_min_s": min(warm),
+            "peak_bytes": peak, **result_size(result)}
+
+
+def metadata():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = bool(subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], capture_output=True,
+                                    text=True, check=True).stdout.strip())
+    except (OSError, subprocess.CalledProcessError):
+        commit, dirty = None, None
+    return {"commit": commit, "dirty": dirty, "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(), "platform": platform.platform(), "pandas": pd.__version__,
+            "numpy": np.__version__, "plotly": plotly.__version__}
+
+
+def compare(report, baseline):
+    # Ratio new/old per (scale, function); above REGRESSION_RATIO (and the noise floor for timings) is flagged
+    old = {(r["scale"], r["function"]): r for r in baseline["results"]}
+    print(f"compared with {baseline['meta'].get('commit')} ({baseline['meta'].get('created')})")
+    for r in report["results"]:
+        base = old.get((r["scale"], r["function"]))
+        if base is None:
+            continue
+        ratios = {key: r[key] / base[key] for key in ("cold_s", "warm_median_s", "peak_bytes") if base[key]}
+        regressed = [key for key, ratio in ratios.items() if ratio > REGRESSION_RATIO and
+                     (key == "peak_bytes" or r[key] - base[key] > NOISE_FLOOR_S)]
+        flag = "  REGRESSION" if regressed else ""
+        print(f"  x{r['scale']:<6g} {r['function']:<36} " +
+              "  ".join(f"{key}={ratio:5.2f}x" for key, ratio in ratios.items()) + flag)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Loader and figure builder benchmarks on scaled-up synthetic data")
+    parser.add_argument("--scales", type=float, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--repeat", type=int, default=5, help="warm calls per function")
+    parser.add_argument("--functions", nargs="+", help="only run functions whose name starts with one of these")
+    parser.add_argument("--work-dir", help="where to write the synthetic datasets (default: a temporary folder)")
+    parser.add_argument("--output", help="JSON report path (default: benchmarks/results/bench_loaders-<commit>.json)")
+    parser.add_argument("--compare", help="earlier JSON report to compare against")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    report = {"meta": metadata(), "results": []}
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="ocodi-bench-")
+    try:
+        for scale in args.scales:
+            t0 = time.perf_counter()
+            paths = generate_datasets(os.path.join(work_dir, f"x{scale:g}"), scale, args.seed)
+            rows = {name: sum(1 for _ in open(path)) - 1 for name, path in paths.items()}
+            print(f"scale x{scale:g}: {rows['full_scaled']} score rows, {rows['predictions']} prediction rows "
+                  f"(generated in {time.perf_counter() - t0:.1f} s)")
+            for name, prepare, call in targets(paths):
+                if args.functions and not any(name.startswith(prefix) for prefix in args.functions):
+                    continue
+                result = measure(paths, name, prepare, call, args.repeat)
+                result.update(scale=scale, score_rows=rows["full_scaled"], prediction_rows=rows["predictions"])
+                report["results"].append(result)
+                print(f"  {name:<36} cold={result['cold_s'] * 1000:10.1f} ms  "
+                      f"warm={result['warm_median_s'] * 1000:10.1f} ms  peak={result['peak_bytes'] / 2 ** 20:8.1f} MiB")
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+    output = args.output or os.path.join("benchmarks", "results",
+                                         f"bench_loaders-{report['meta']['commit'] or 'local'}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"report written to {output}")
+    if args.compare:
+        with open(args.compare) as f:
+            compare(report, json.load(f))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+# Cold-start report: import time of the heavy modules and time to first paint of the app, each measured
+# in a fresh interpreter. "First paint" is the moment the page title is emitted, "full page" the end of
+# the first script run. With --warm-up the caches are filled in the same process first, as with
+# python -m utils.warmup --serve. Run from the project root: python -m benchmarks.bench_startup
+
+MODULES = ["streamlit", "streamlit_extras.add_vertical_space", "streamlit_extras.metric_cards", "numpy", "pandas",
+           "plotly.express", "utils.load_preprocess_data", "utils.viz"]
+
+
+def child_import(module):
+    t0 = time.perf_counter()
+    __import__(module)
+    return {"seconds": time.perf_counter() - t0}
+
+
+def child_first_paint(script, warm_up):
+    import streamlit
+    from streamlit.testing.v1 import AppTest
+
+    warm_up_seconds = 0.0
+    if warm_up:
+        from utils.warmup import warm_up as run_warm_up
+        t0 = time.perf_counter()
+        run_warm_up("data/full_scaled.csv", "data/predictions.csv", "data/countries.csv",
+                    "data/images/kompzkfe_logo.png")
+        warm_up_seconds = time.perf_counter() - t0
+
+    painted = []
+    st_title = streamlit.title
+
+    def title(*args, **kwargs):
+        painted.append(time.perf_counter())
+        return st_title(*args, **kwargs)
+
+    streamlit.title = title
+    at = AppTest.from_file(script, default_timeout=300)
+    t0 = time.perf_counter()
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return {"first_paint": painted[0] - t0, "full_page": time.perf_counter() - t0, "warm_up": warm_up_seconds}
+
+
+def run_child(*args):
+    output = subprocess.run([sys.executable, "-m", "benchmarks.bench_startup", "--child", *args],
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import time and time to first paint on a cold start")
+    parser.add_argument("--script", default="StreamlitApp.py")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--child", nargs="+", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        kind, *rest = args.child
+        result = child_import(*rest) if kind == "import" else child_first_paint(rest[0], rest[1] == "warm")
+        print(json.dumps(result))
+        return
+
+    print("import time (fresh interpreter, median)")
+    for module in MODULES:
+        seconds = statistics.median(run_child("import", module)["seconds"] for _ in range(args.repeat))
+        print(f"  {module:<36} {seconds * 1000:8.1f} ms")
+
+    print(f"time to first paint of {args.script} (fresh interpreter, median)")
+    for mode in ("cold", "warm"):
+        runs = [run_child("paint", args.script, mode) for _ in range(args.repeat)]
+        first_paint = statistics.median(run["first_paint"] for run in runs)
+        full_page = statistics.median(run["full_page"] for run in runs)
+        warm_up = statistics.median(run["warm_up"] for run in runs)
+        label = "after in-process warm-up" if mode == "warm" else "cold process"
+        print(f"  {label:<26} first paint={first_paint * 1000:8.1f} ms  full page={full_page * 1000:8.1f} ms  "
+              f"warm-up={warm_up * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+import argparse
+import glob
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+from benchmarks.synthetic import generate_datasets
+from utils.data_store import CACHE_DIR_NAME, MMAP_SUFFIX
+
+# Memory per worker process when several app replicas run on one host, with the datasets parsed in
+# every process ("parse") or opened from the memory-mapped copies written by utils.build_mmap ("mmap").
+# Each worker loads what the app keeps in memory (score store, lookup index, aggregate cube,
+# predictions, country names) and touches every column, then waits. RSS counts the shared page-cache
+# pages in every process; PSS splits them between the processes mapping them, so with mmap the PSS per
+# worker goes down as replicas are added. Linux only (/proc/<pid>/smaps_rollup).
+# Run from the project root: python -m benchmarks.bench_workers --scale 20 --replicas 1 2 4 8
+
+
+def child(path_full_scaled, path_predictions, path_countries):
+    from utils.aggregates import load_aggregate_cube
+    from utils.data_store import load_score_index, load_score_store
+    from utils.load_preprocess_data import load_country_names, load_predictions
+
+    for df in (load_score_store(path_full_scaled), load_predictions(path_predictions)):
+        for column in df.columns:
+            values = df[column]
+            values = (values.cat.codes if values.dtype == "category" else values).to_numpy()
+            if values.dtype != object:
+                # One byte of every page, so mapped columns are resident like parsed ones
+                values.view("uint8")[::4096].sum()
+    load_score_index(path_full_scaled)
+    load_aggregate_cube(path_full_scaled).table("yearly")
+    load_country_names(path_countries)
+    print("ready", flush=True)
+    sys.stdin.readline()
+
+
+def memory(pid):
+    # kB values of /proc/<pid>/smaps_rollup
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) == 3 and parts[2] == "kB":
+                fields[parts[0].rstrip(":")] = int(parts[1])
+    return fields
+
+
+def run_workers(paths, n_workers):
+    workers = [subprocess.Popen([sys.executable, "-m", "benchmarks.bench_workers", "--child",
+                                 paths["full_scaled"], paths["predictions"], paths["countries"]],
+                                stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True)
+               for _ in range(n_workers)]
+    try:
+        for worker in workers:
+            if worker.stdout.readline().strip() != "ready":
+                raise RuntimeError("worker failed to load the datasets")
+        readings = [memory(worker.pid) for worker in workers]
+    finally:
+        for worker in workers:
+            worker.stdin.close()
+            worker.wait()
+    n = len(readings)
+    return {key: sum(r.get(field, 0) for r in readings for field in fields) / n / 1024
+            for key, fields in [("rss", ["Rss"]), ("pss", ["Pss"]),
+                                ("private", ["Private_Clean", "Private_Dirty"])]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Memory per app worker, parsed vs. memory-mapped datasets")
+    parser.add_argument("--scale", type=float, default=20)
+    parser.add_argument("--replicas", type=int, nargs="+", default=[1, 2, 4, 8])
+    parser.add_argument("--modes", nargs="+", default=["parse", "mmap"], choices=["parse", "mmap"])
+    parser.add_argument("--work-dir", help="where to write the synthetic datasets (default: a temporary folder)")
+    parser.add_argument("--child", nargs=3, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(*args.child)
+        return
+
+    from utils.build_mmap import build
+
+    work_dir = args.work_dir or tempfile.mkdtemp(prefix="ocodi-bench-")
+    try:
+        paths = generate_datasets(os.path.join(work_dir, f"x{args.scale:g}"), args.scale)
+        cache_dir = os.path.join(os.path.dirname(paths["full_scaled"]), CACHE_DIR_NAME)
+        print(f"scale x{args.scale:g}: {os.path.getsize(paths['full_scaled']) / 2 ** 20:.1f} MiB full_scaled.csv")
+        for mode in args.modes:
+            for mmap_dir in glob.glob(os.path.join(cache_dir, f"*{MMAP_SUFFIX}")):
+                shutil.rmtree(mmap_dir)
+            if mode == "mmap":
+                build(paths["full_scaled"], paths["predictions"], paths["countries"])
+            for n_workers in args.replicas:
+                t0 = time.perf_counter()
+                result = run_workers(paths, n_workers)
+                print(f"{mode:<6} replicas={n_workers:<3} per worker: RSS={result['rss']:7.1f} MiB  "
+                      f"PSS={result['pss']:7.1f} MiB  private={result['private']:7.1f} MiB  "
+                      f"(ready in {time.perf_counter() - t0:.1f} s)")
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
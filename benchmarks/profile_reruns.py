@@ -0,0 +1,107 @@
+import argparse
+import os
+import statistics
+import time
+from collections import defaultdict
+from datetime import datetime
+from functools import wraps
+
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+import streamlit
+from streamlit.testing.v1 import AppTest
+
+# Rerun-time profile per interaction type. "full rerun" is the wall time of re-executing the whole
+# script, which is what every interaction cost before the page was split into fragments; "fragment
+# rerun" is the time spent in the fragment that owns the widget, which is all that reruns now.
+# Run from the project root: python -m benchmarks.profile_reruns
+
+fragment_timings = defaultdict(float)
+_st_fragment = streamlit.fragment
+
+
+def timed_fragment(func=None, **kwargs):
+    if func is None:
+        return lambda f: timed_fragment(f, **kwargs)
+
+    @wraps(func)
+    def timed(*args, **inner_kwargs):
+        t0 = time.perf_counter()
+        try:
+            return func(*args, **inner_kwargs)
+        finally:
+            fragment_timings[func.__name__] += time.perf_counter() - t0
+    return _st_fragment(timed, **kwargs)
+
+
+def widget(elements, label):
+    return next(element for element in elements if element.label == label)
+
+
+# (interaction, fragment owning the widget, action applied before the rerun)
+INTERACTIONS = [
+    ("trends year selector", "trends_section",
+     lambda at, i: widget(at.selectbox, "Select a year").set_value([2015, 2022][i % 2])),
+    ("trends score selector", "trends_section",
+     lambda at, i: widget(at.selectbox, "Select a score").set_value(["HGI4", "OCoDi"][i % 2])),
+    ("region selector", "predictions_section",
+     lambda at, i: widget(at.selectbox, "Select a region").set_value(["europe", "asia"][i % 2])),
+    ("period selector", "predictions_section",
+     lambda at, i: widget(at.selectbox, "Select a period").set_value(["2021", None][i % 2])),
+    ("time series radio", "time_series_section",
+     lambda at, i: widget(at.radio, "Time Series Comparison").set_value(
+         ["Score Comparison", "Country Comparison"][i % 2])),
+    ("country comparison: countries", "country_comparison",
+     lambda at, i: widget(at.multiselect, "Select a country").set_value(["NGA", "SYR", "AFG"][:i % 3 + 1])),
+    ("country comparison: time period", "country_comparison",
+     lambda at, i: widget(at.slider, "Select a time period").set_value(
+         (datetime(2004 + i % 5, 1, 31), datetime(2020, 12, 31)))),
+    ("country comparison: aggregation", "country_comparison",
+     lambda at, i: widget(at.radio, "Select a aggregation period").set_value(["yearly", "monthly"][i % 2])),
+]
+
+
+def rerun(at):
+    fragment_timings.clear()
+    t0 = time.perf_counter()
+    at.run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].message)
+    return time.perf_counter() - t0, dict(fragment_timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Full-script vs. fragment rerun time per interaction")
+    parser.add_argument("--script", default="StreamlitApp.py")
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    streamlit.fragment = timed_fragment
+    at = AppTest.from_file(args.script, default_timeout=300)
+    cold, _ = rerun(at)
+    warm, _ = rerun(at)
+    print(f"{'initial load (cold caches)':<34} full rerun={cold * 1000:8.1f} ms")
+    print(f"{'initial load (warm caches)':<34} full rerun={warm * 1000:8.1f} ms")
+
+    for label, fragment_name, interact in INTERACTIONS:
+        full_runs, fragment_runs = [], []
+        if fragment_name == "country_comparison":
+            widget(at.radio, "Time Series Comparison").set_value("Country Comparison")
+            rerun(at)
+        for i in range(args.repeat):
+            try:
+                interact(at, i)
+            except StopIteration:
+                break
+            full, fragments = rerun(at)
+            full_runs.append(full * 1000)
+            fragment_runs.append(fragments.get(fragment_name, 0) * 1000)
+        if not full_runs:
+            print(f"{label:<34} widget not found in {args.script}")
+            continue
+        print(f"{label:<34} full rerun={statistics.median(full_runs):8.1f} ms  "
+              f"fragment rerun ({fragment_name})={statistics.median(fragment_runs):8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+import argparse
+import itertools
+import math
+import os
+import string
+
+import numpy as np
+import pandas as pd
+
+from utils.data_store import SCORE_COLUMNS
+
+# Synthetic datasets with the schemas of data/full_scaled.csv, data/predictions.csv and
+# data/countries.csv, scaled up by a factor. Real country codes are used first, then made-up
+# three-letter unit codes (as for subnational units); once those run out the series get longer,
+# going back in time month by month. Scores are drawn per column with the mean and spread of the
+# real data, ConfliBERT is missing for the last 12 months like in the original.
+# python -m benchmarks.synthetic --scale 10 --out-dir /tmp/ocodi-x10
+
+BASE_UNITS = 108
+BASE_MONTHS = 233
+BASE_PREDICTION_MONTHS = 24
+LAST_MONTH = pd.Timestamp(2022, 12, 1)
+MAX_UNITS = 26 ** 3
+
+
+def unit_codes(n_units, real_codes):
+    real_codes = list(real_codes)[:n_units]
+    taken = set(real_codes)
+    synthetic = ("".join(letters) for letters in itertools.product(string.ascii_uppercase, repeat=3))
+    synthetic = (code for code in synthetic if code not in taken)
+    return real_codes + list(itertools.islice(synthetic, n_units - len(real_codes)))
+
+
+def shape(scale, base_units, base_months):
+    # (units, months) for `scale` times the rows of a base_units x base_months table
+    n_units = min(math.ceil(base_units * scale), MAX_UNITS)
+    n_months = max(1, round(base_units * base_months * scale / n_units))
+    return n_units, n_months
+
+
+def _panel(codes, n_months):
+    months = pd.date_range(end=LAST_MONTH, periods=n_months, freq="MS")
+    iso3 = np.repeat(np.asarray(codes, dtype=object), n_months)
+    dates = np.tile(months, len(codes))
+    return iso3, pd.DatetimeIndex(dates)
+
+
+def generate_full_scaled(codes, n_months, rng, stats):
+    iso3, dates = _panel(codes, n_months)
+    df = pd.DataFrame({"iso3": iso3, "yearmon": dates.strftime("%Y-%m")})
+    for column in SCORE_COLUMNS:
+        mean, std = stats[column]
+        df[column] = rng.normal(mean, std, len(df)).astype("float64")
+    df.loc[dates > LAST_MONTH - pd.DateOffset(months=12), "ConfliBERT"] = np.nan
+    df.insert(3, "year", dates.year)
+    df.insert(4, "month", dates.month)
+    df.index = np.arange(1, len(df) + 1)
+    return df[["iso3", "yearmon", "lnFatalities", "year", "month"] + SCORE_COLUMNS[1:]]
+
+
+def generate_predictions(codes, n_months, rng):
+    iso3, dates = _panel(codes, n_months)
+    df = pd.DataFrame({"iso3": iso3, "yearmon": dates.strftime("%Y-%m"),
+                       "predicted_fatalities": rng.lognormal(2.0, 1.5, len(iso3))})
+    df.index = np.arange(1, len(df) + 1)
+    return df
+
+
+def generate_countries(codes, df_countries):
+    known = df_countries.set_index(df_countries["alpha3"].str.upper())
+    rows = []
+    for i, code in enumerate(codes):
+        if code in known.index:
+            rows.append(known.loc[code].to_dict())
+        else:
+            rows.append({"id": 10000 + i, "alpha2": "", "alpha3": code.lower(), "name": f"Unit {code}"})
+    return pd.DataFrame(rows, columns=["id", "alpha2", "alpha3", "name"])
+
+
+def generate_datasets(out_dir, scale, seed=0, data_dir="data"):
+    # Writes full_scaled.csv, predictions.csv and countries.csv to out_dir and returns their paths
+    rng = np.random.default_rng(seed)
+    df_base = pd.read_csv(os.path.join(data_dir, "full_scaled.csv"))
+    df_countries = pd.read_csv(os.path.join(data_dir, "countries.csv"))
+    stats = {column: (df_base[column].mean(), df_base[column].std()) for column in SCORE_COLUMNS}
+    real_codes = sorted(df_base["iso3"].unique())
+
+    n_units, n_months = shape(scale, BASE_UNITS, BASE_MONTHS)
+    codes = unit_codes(n_units, real_codes)
+    _, n_prediction_months = shape(scale, BASE_UNITS, BASE_PREDICTION_MONTHS)
+
+    os.makedirs(out_dir, exist_ok=True)
+    paths = {name: os.path.join(out_dir, f"{name}.csv") for name in ("full_scaled", "predictions", "countries")}
+    generate_full_scaled(codes, n_months, rng, stats).to_csv(paths["full_scaled"])
+    generate_predictions(codes, n_prediction_months, rng).to_csv(paths["predictions"])
+    generate_countries(codes, df_countries).to_csv(paths["countries"], index=False)
+    return paths
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write synthetic scaled-up copies of the app's datasets")
+    parser.add_argument("--scale", type=float, default=10)
+    parser.add_argument("--out-dir", required=True)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    for name, path in generate_datasets(args.out_dir, args.scale, args.seed).items():
+        print(f"{name:<12} {path}")
@@ -27,5 +27,20 @@ dict_scope = {
     "africa": "Africa"
 }
 
+# Countries of the data per map region (dict_scope); "world" selects all countries
+dict_scope_countries = {
+    "europe": ["ALB", "BEL", "BIH", "DEU", "ESP", "FRA", "GBR", "HRV", "MDA", "MKD", "RUS", "SRB", "TUR", "UKR"],
+    "north america": ["GTM", "HND", "HTI", "JAM", "MEX", "NIC", "SLV", "USA"],
+    "south america": ["BOL", "BRA", "COL", "ECU", "GUY", "PER", "PRY", "VEN"],
+    "asia": ["AFG", "ARE", "ARM", "AZE", "BGD", "BHR", "CHN", "GEO", "IDN", "IND", "IRN", "IRQ", "ISR", "JOR", "KGZ",
+             "KHM", "KWT", "LBN", "LKA", "MMR", "MYS", "NPL", "PAK", "PHL", "QAT", "SAU", "SYR", "THA", "TJK", "UZB",
+             "YEM"],
+    "africa": ["AGO", "BDI", "BEN", "BFA", "CAF", "CIV", "CMR", "COD", "COG", "COM", "DJI", "DZA", "EGY", "ERI", "ETH",
+               "GHA", "GIN", "GMB", "GNB", "KEN", "LBR", "LBY", "LSO", "MAR", "MDG", "MLI", "MOZ", "MRT", "NER", "NGA",
+               "RWA", "SDN", "SEN", "SLE", "SOM", "SSD", "SWZ", "TCD", "TGO", "TUN", "TZA", "UGA", "ZAF", "ZMB", "ZWE"]
+}
 
-
+dict_metrics = {
+    "corr": "Correlation",
+    "rmse": "RMSE of a linear fit"
+}
@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.aggregates import AGG_LEVELS, AGG_STATS, AggregateCube
+from utils.data_store import read_score_csv
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "data", "full_scaled.csv")
+CUTOFF = pd.Timestamp("2020-06-01")
+
+
+@pytest.fixture(scope="module")
+def scores():
+    return read_score_csv(DATA_PATH)
+
+
+def assert_same_cube(cube, expected):
+    for agg_period in AGG_LEVELS:
+        for stat in AGG_STATS:
+            pd.testing.assert_frame_equal(cube.table(agg_period, stat), expected.table(agg_period, stat))
+    pd.testing.assert_series_equal(cube.last_dates, expected.last_dates)
+    assert cube.fingerprint == expected.fingerprint
+
+
+def edit_history(df):
+    df = df.copy()
+    row = df.index[(df["iso3"] == "NGA") & (df["DATE"] == pd.Timestamp("2015-03-01"))][0]
+    df.loc[row, "OCoDi"] += np.float32(20.0)
+    return df
+
+
+def test_refresh_appended_months(scores):
+    cube = AggregateCube.build(scores[scores["DATE"] <= CUTOFF], "old")
+    assert_same_cube(cube.refreshed(scores, "new"), AggregateCube.build(scores, "new"))
+
+
+def test_refresh_edited_history_and_appended_months(scores):
+    cube = AggregateCube.build(scores[scores["DATE"] <= CUTOFF], "old")
+    revised = edit_history(scores)
+    refreshed = cube.refreshed(revised, "new")
+    assert_same_cube(refreshed, AggregateCube.build(revised, "new"))
+    assert refreshed.table("yearly").loc[("NGA", "2015-12-31"), "OCoDi"] != \
+        cube.table("yearly").loc[("NGA", "2015-12-31"), "OCoDi"]
+
+
+def test_refresh_removed_history_and_appended_months(scores):
+    cube = AggregateCube.build(scores[scores["DATE"] <= CUTOFF], "old")
+    revised = scores.drop(scores.index[(scores["iso3"] == "AFG") & (scores["DATE"] < "2012-01-01")])
+    assert_same_cube(cube.refreshed(revised, "new"), AggregateCube.build(revised, "new"))
+
+
+def test_refresh_edited_history_only(scores):
+    cube = AggregateCube.build(scores, "old")
+    revised = edit_history(scores)
+    assert_same_cube(cube.refreshed(revised, "new"), AggregateCube.build(revised, "new"))
@@ -0,0 +1,35 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils.correlations import WINDOWS, CorrelationEngine
+from utils.data_store import read_score_csv
+
+DATA_PATH = os.path.join(os.path.dirname(__file__), os.pardir, "data", "full_scaled.csv")
+
+
+@pytest.fixture(scope="module")
+def engine():
+    return CorrelationEngine.build(read_score_csv(DATA_PATH), "test")
+
+
+@pytest.mark.parametrize("window", WINDOWS)
+def test_rolling_every_window(engine, window):
+    df = engine.rolling("NGA", ["OCoDi", "Vader"], "corr", window, pd.Timestamp("2015-01-01"))
+    assert list(df["SCORE_NAME"].unique()) == ["OCoDi", "Vader"]
+    assert df["DATE"].min() == pd.Timestamp("2015-01-01")
+    assert len(df) == 2 * (engine.months >= pd.Timestamp("2015-01-01")).sum()
+
+
+def test_rolling_whole_period_repeats_summary(engine):
+    summary = engine.summary("rmse").set_index("iso3").loc["NGA"]
+    df = engine.rolling("NGA", ["OCoDi", "Vader"], "rmse", None)
+    for score, values in df.groupby("SCORE_NAME")["SCORE_VALUE"]:
+        np.testing.assert_allclose(values.to_numpy(), summary[score])
+
+
+def test_rolling_unknown_metric(engine):
+    with pytest.raises(ValueError):
+        engine.rolling("NGA", ["OCoDi"], "mae", 12)
@@ -0,0 +1,39 @@
+import numpy as np
+
+from utils.metrics import function_metrics, instrument, start_exporter
+from utils.resources import sizeof
+
+
+def test_redecorated_function_keeps_counting():
+    for _ in range(3):
+        @instrument(name="test.section")
+        def section():
+            return np.zeros(4), 10
+        section()
+    metrics = [m for m in function_metrics() if m["function"] == "test.section"]
+    assert len(metrics) == 1
+    assert metrics[0]["calls"] == 3
+    assert metrics[0]["rows"] == 12
+
+
+def test_sizeof_counts_object_attributes_once():
+    class Engine:
+        def __init__(self):
+            self.values = np.zeros(1000)
+            self.results = {"a": self.values, "b": np.zeros(500)}
+
+    assert 12000 <= sizeof(Engine()) < 13000
+
+
+def test_exporter_on_busy_port(monkeypatch):
+    import socket
+
+    import utils.metrics
+
+    with socket.socket() as busy:
+        busy.bind(("0.0.0.0", 0))
+        busy.listen()
+        monkeypatch.setenv("OCODI_METRICS_PORT", str(busy.getsockname()[1]))
+        monkeypatch.delenv("OCODI_METRICS_FILE", raising=False)
+        monkeypatch.setattr(utils.metrics, "_exporter_started", False)
+        start_exporter()
@@ -0,0 +1,31 @@
+import numpy as np
+
+from utils.rankings import RankingEngine
+
+COUNTRIES = np.array(["NGA", "AFG", "SYR", "BRA", "COL", "DEU", "ETH"], dtype=object)
+
+
+def make_engine(order):
+    values = np.array([[2.0, 1.0, 2.0, 1.0, 2.0, 1.0, np.nan]])
+    return RankingEngine("test", np.array([2022]), COUNTRIES[order], {("OCoDi", "mean"): values[:, order]})
+
+
+def ranked(engine, n):
+    df = engine.ranking("OCoDi", 2022, n=n)
+    return list(zip(df["Highest_Lowest"], df["ISO_A3"]))
+
+
+def test_ties_are_broken_by_iso3():
+    engine = make_engine(np.arange(len(COUNTRIES)))
+    highest, lowest = engine.top_bottom("OCoDi", 2022, n=2)
+    assert list(engine.countries[highest]) == ["COL", "NGA"]
+    assert list(engine.countries[lowest]) == ["AFG", "BRA"]
+
+
+def test_tie_order_is_stable_across_calls_and_layouts():
+    expected = ranked(make_engine(np.arange(len(COUNTRIES))), 3)
+    rng = np.random.default_rng(0)
+    for _ in range(10):
+        engine = make_engine(rng.permutation(len(COUNTRIES)))
+        assert ranked(engine, 3) == expected
+        assert ranked(engine, 3) == ranked(engine, 3)
@@ -0,0 +1,24 @@
+import threading
+import time
+
+from utils.resources import data_cache
+
+
+def test_data_cache_computes_concurrent_misses_once():
+    calls = []
+
+    @data_cache(max_bytes=1 << 20)
+    def load(key):
+        calls.append(key)
+        time.sleep(0.05)
+        return [key]
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(load("a"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert calls == ["a"]
+    assert results == [["a"]] * 8
+    assert load.cache.misses == 8 and load.cache.hits == 0
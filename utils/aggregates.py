@@ -0,0 +1,129 @@
+import threading
+
+import pandas as pd
+
+from utils.data_store import SCORE_COLUMNS, dataset_version, load_score_store
+from utils.resources import shared_resource
+
+# Materialized country x period x score cube with sum and count per cell, so means can be
+# derived at any level and new months can be folded in without regrouping the full history.
+# A fingerprint of the aggregated rows tells appended months apart from revised history.
+
+AGG_LEVELS = {"monthly": "M", "quarterly": "Q", "yearly": "Y"}
+AGG_STATS = ("mean", "sum", "count")
+
+
+def period_labels(dates, agg_period):
+    # Same labels as pd.Grouper: months keep their date, quarters and years are labelled by their last day
+    if agg_period == "monthly":
+        return dates
+    periods = dates.dt.to_period(AGG_LEVELS[agg_period])
+    return periods.dt.to_timestamp(how="end").dt.normalize()
+
+
+def _partial_aggregates(df):
+    values = df[SCORE_COLUMNS].astype("float64")
+    iso3 = df["iso3"].astype(str)
+    partials = {}
+    for agg_period in AGG_LEVELS:
+        keys = [iso3, period_labels(df["DATE"], agg_period).rename("DATE")]
+        grouped = values.groupby(keys, observed=True, sort=True)
+        partials[agg_period] = (grouped.sum(), grouped.count())
+    return partials
+
+
+def _last_dates(df):
+    return df["DATE"].groupby(df["iso3"].astype(str)).max()
+
+
+def _row_hashes(df):
+    # Summed (wrapping) into an order-independent fingerprint of a set of rows
+    return pd.util.hash_pandas_object(df[["iso3", "DATE"] + SCORE_COLUMNS], index=False).to_numpy()
+
+
+class AggregateCube:
+
+    def __init__(self, version, n_rows, fingerprint, last_dates, sums, counts):
+        self.version = version
+        self.n_rows = n_rows
+        self.fingerprint = fingerprint
+        self.last_dates = last_dates
+        self.sums = sums
+        self.counts = counts
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, df, version):
+        partials = _partial_aggregates(df)
+        return cls(version, len(df), _row_hashes(df).sum(), _last_dates(df),
+                   {agg_period: sums for agg_period, (sums, _) in partials.items()},
+                   {agg_period: counts for agg_period, (_, counts) in partials.items()})
+
+    def refreshed(self, df, version):
+        # Rows dated after a country's last aggregated month are treated as appended. The other rows
+        # must be exactly the ones aggregated before; if any was edited, added or removed the cube is
+        # rebuilt.
+        last_dates = self.last_dates.reindex(df["iso3"].cat.categories).to_numpy()
+        row_last_dates = last_dates[df["iso3"].cat.codes.to_numpy()]
+        appended = pd.isna(row_last_dates) | (df["DATE"].to_numpy() > row_last_dates)
+        hashes = _row_hashes(df)
+        if (not appended.any() or len(df) - appended.sum() != self.n_rows
+                or hashes[~appended].sum() != self.fingerprint):
+            return AggregateCube.build(df, version)
+        new_rows = df[appended]
+        sums = dict(self.sums)
+        counts = dict(self.counts)
+        for agg_period, (new_sums, new_counts) in _partial_aggregates(new_rows).items():
+            if agg_period == "monthly":
+                # Appended months are new cells
+                sums[agg_period] = pd.concat([sums[agg_period], new_sums]).sort_index()
+                counts[agg_period] = pd.concat([counts[agg_period], new_counts]).sort_index()
+            else:
+                sums[agg_period] = sums[agg_period].add(new_sums, fill_value=0).sort_index()
+                counts[agg_period] = counts[agg_period].add(new_counts, fill_value=0).astype("int64").sort_index()
+        last_dates = pd.concat([self.last_dates, _last_dates(new_rows)]).groupby(level=0).max()
+        return AggregateCube(version, len(df), hashes.sum(), last_dates, sums, counts)
+
+    def table(self, agg_period, stat="mean"):
+        # Wide table indexed by (iso3, DATE) with one column per score; memoized per level and statistic
+        key = (agg_period, stat)
+        if key not in self._tables:
+            with self._lock:
+                if stat == "mean":
+                    counts = self.counts[agg_period]
+                    table = self.sums[agg_period].div(counts.where(counts > 0))
+                elif stat == "sum":
+                    table = self.sums[agg_period]
+                elif stat == "count":
+                    table = self.counts[agg_period]
+                else:
+                    raise ValueError(f"Unknown aggregation statistic '{stat}', expected one of {AGG_STATS}")
+                self._tables[key] = table
+        return self._tables[key]
+
+    def country_table(self, agg_period, country, start_date=None, end_date=None, stat="mean"):
+        table = self.table(agg_period, stat)
+        try:
+            table = table.xs(country, level="iso3")
+        except KeyError:
+            table = table.iloc[:0].droplevel("iso3")
+        return table.loc[start_date:end_date]
+
+
+@shared_resource()
+def _cube_registry():
+    return {"lock": threading.Lock(), "cubes": {}}
+
+
+def load_aggregate_cube(path):
+    version = dataset_version(path)
+    registry = _cube_registry()
+    with registry["lock"]:
+        cube = registry["cubes"].get(path)
+        if cube is None:
+            cube = AggregateCube.build(load_score_store(path), version)
+        elif cube.version != version:
+            cube = cube.refreshed(load_score_store(path), version)
+        registry["cubes"][path] = cube
+    return cube
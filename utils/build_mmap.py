@@ -0,0 +1,40 @@
+import argparse
+import os
+import time
+
+from utils.data_store import dataset_version, mmap_path, read_score_csv, write_cache_file, write_mmap_frame
+from utils.load_preprocess_data import read_country_names_csv, read_predictions_csv
+
+# Offline build step: writes memory-mapped copies of the datasets (one .npy file per column plus an
+# index) to the data cache folder. The loaders open them without parsing or copying, so several app or
+# API processes on one host share a single copy in the page cache instead of holding a parsed copy each.
+# The copies belong to one dataset version; after the CSV files change, loaders fall back to parsing
+# them until the step is run again. Run from the project root:
+#   python -m utils.build_mmap
+
+
+def build(path_full_scaled, path_predictions, path_countries):
+    # {dataset path: (folder of the memory-mapped copy, size in bytes)}
+    built = {}
+    for path, read in [(path_full_scaled, read_score_csv), (path_predictions, read_predictions_csv),
+                       (path_countries, read_country_names_csv)]:
+        out_dir = mmap_path(path, dataset_version(path))
+        df = read(path)
+        write_cache_file(out_dir, lambda tmp_path: write_mmap_frame(df, tmp_path))
+        if not os.path.isdir(out_dir):
+            raise OSError(f"Could not write {out_dir}")
+        built[path] = (out_dir, sum(entry.stat().st_size for entry in os.scandir(out_dir)))
+    return built
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Write memory-mapped copies of the app's datasets")
+    parser.add_argument("--full-scaled", default="data/full_scaled.csv")
+    parser.add_argument("--predictions", default="data/predictions.csv")
+    parser.add_argument("--countries", default="data/countries.csv")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    for path, (out_dir, size) in build(args.full_scaled, args.predictions, args.countries).items():
+        print(f"{path:<28} -> {out_dir} ({size / 2 ** 20:.1f} MiB)")
+    print(f"built in {time.perf_counter() - t0:.1f} s")
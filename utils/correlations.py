@@ -0,0 +1,139 @@
+import threading
+
+import numpy as np
+import pandas as pd
+
+from utils.data_store import dataset_version, load_score_store
+from utils.resources import shared_resource
+
+# How closely each score follows lnFatalities, per country and month: correlation over a trailing window
+# of months and the RMSE of lnFatalities predicted from the score by a least-squares line fitted in the
+# same window (the scores have different scales and signs, so they are not compared to lnFatalities
+# directly). Everything is computed for all countries and scores at once on a dense
+# country x month x score array, with the window sums taken as differences of cumulative sums.
+
+COMPARED_SCORES = ["OCoDi", "HGI4", "Vader", "Wordscores", "Wordfish", "ConfliBERT", "CAMEO"]
+METRICS = ("corr", "rmse")
+# Trailing windows in months computed when the engine is built; None is the whole period
+WINDOWS = (None, 12, 24, 36)
+# Months with both values needed for a value over the whole period
+MIN_PERIODS = 12
+
+
+def dense_panel(df, columns):
+    # Country x month x column array of the monthly rows, NaN where a country has no row for a month
+    codes = df["iso3"].cat.codes.to_numpy()
+    present = np.unique(codes)
+    countries = df["iso3"].cat.categories.to_numpy(dtype=object)[present]
+    month_numbers = df["DATE"].dt.year.to_numpy().astype("int64") * 12 + df["DATE"].dt.month.to_numpy() - 1
+    first = month_numbers.min()
+    n_months = month_numbers.max() - first + 1
+    months = pd.date_range(df["DATE"].min(), periods=n_months, freq="MS")
+    panel = np.full((len(countries), n_months, len(columns)), np.nan)
+    panel[np.searchsorted(present, codes), month_numbers - first] = df[columns].to_numpy(dtype="float64")
+    return countries, months, panel
+
+
+def _window_sums(values, window):
+    # Sums over the trailing `window` months (axis 1); window=None sums over all months
+    if window is None:
+        return values.sum(axis=1, keepdims=True)
+    sums = np.cumsum(values, axis=1)
+    sums[:, window:] -= sums[:, :-window].copy()
+    return sums
+
+
+def _min_periods(window):
+    return MIN_PERIODS if window is None else max(3, window // 2)
+
+
+def window_metrics(fatalities, scores, window):
+    # {metric: country x month x score array} for a country x month array of lnFatalities and a
+    # country x month x score array of scores; only months where both are present count
+    y = fatalities[:, :, None]
+    valid = np.isfinite(scores) & np.isfinite(y)
+    x = np.where(valid, scores, 0.0)
+    y = np.where(valid, y, 0.0)
+    n = _window_sums(valid.astype("float64"), window)
+    sx, sy = _window_sums(x, window), _window_sums(y, window)
+    sxx, syy, sxy = _window_sums(x * x, window), _window_sums(y * y, window), _window_sums(x * y, window)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        # n^2 times the (co)variances; tiny values are rounding noise of constant windows
+        var_x = n * sxx - sx * sx
+        var_y = n * syy - sy * sy
+        cov = n * sxy - sx * sy
+        defined = (n >= _min_periods(window)) & (var_x > 1e-9 * n * sxx) & (var_y > 1e-9 * n * syy)
+        corr = np.where(defined, np.clip(cov / np.sqrt(var_x * var_y), -1.0, 1.0), np.nan)
+        rmse = np.where(defined, np.sqrt(np.maximum(var_y * (1 - corr * corr), 0.0)) / n, np.nan)
+    return {"corr": corr, "rmse": rmse}
+
+
+class CorrelationEngine:
+
+    def __init__(self, version, countries, months, fatalities, scores):
+        self.version = version
+        self.countries = countries
+        self.months = months
+        self.fatalities = fatalities
+        self.scores = scores
+        self._country_rows = {country: i for i, country in enumerate(countries)}
+        self._results = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def build(cls, df, version):
+        countries, months, panel = dense_panel(df, ["lnFatalities"] + COMPARED_SCORES)
+        engine = cls(version, countries, months, panel[:, :, 0], panel[:, :, 1:])
+        for window in WINDOWS:
+            engine.metrics(window)
+        return engine
+
+    def metrics(self, window=None):
+        # Memoized per window, so other window sizes are computed once on first use
+        if window not in self._results:
+            with self._lock:
+                if window not in self._results:
+                    self._results[window] = window_metrics(self.fatalities, self.scores, window)
+        return self._results[window]
+
+    def _values(self, metric, window):
+        results = self.metrics(window)
+        if metric not in results:
+            raise ValueError(f"Unknown metric '{metric}', expected one of {METRICS}")
+        return results[metric]
+
+    def rolling(self, country, list_scores, metric="corr", window=12, start_date=None, end_date=None):
+        # Long (DATE, SCORE_NAME, SCORE_VALUE) rows of one country, like preprocess_country_table
+        scores = [score for score in COMPARED_SCORES if score in list_scores]
+        mask = np.ones(len(self.months), dtype=bool)
+        if start_date is not None:
+            mask &= self.months >= start_date
+        if end_date is not None:
+            mask &= self.months <= end_date
+        row = self._country_rows.get(country)
+        values = np.full((mask.sum(), len(scores)), np.nan)
+        if row is not None:
+            values = self._values(metric, window)[row]
+            if window is None:
+                # The whole-period value on every month
+                values = np.broadcast_to(values, (len(self.months), values.shape[1]))
+            values = values[mask][:, [COMPARED_SCORES.index(s) for s in scores]]
+        return pd.DataFrame({"DATE": np.tile(self.months[mask], len(scores)),
+                             "SCORE_NAME": np.repeat(scores, mask.sum()),
+                             "SCORE_VALUE": values.T.ravel()})
+
+    def summary(self, metric="corr"):
+        # Whole-period value per country (rows) and score (columns)
+        values = self._values(metric, None)[:, 0, :]
+        df = pd.DataFrame(values, columns=COMPARED_SCORES)
+        df.insert(0, "iso3", self.countries)
+        return df
+
+
+@shared_resource(max_entries=4)
+def _load_correlation_engine(path, version):
+    return CorrelationEngine.build(load_score_store(path), version)
+
+
+def load_correlation_engine(path):
+    return _load_correlation_engine(path, dataset_version(path))
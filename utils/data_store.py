@@ -0,0 +1,207 @@
+import hashlib
+import json
+import os
+import shutil
+
+import numpy as np
+import pandas as pd
+
+from utils.resources import shared_resource
+
+# Process-wide, typed store of data/full_scaled.csv. The CSV is parsed once per
+# dataset version and shared (not copied) by every session through
+# shared_resource, so callers must treat the returned frames as read-only.
+# If utils.build_mmap has written a memory-mapped copy of the dataset, the store
+# is opened from it without parsing or copying, so all processes on a host share
+# one copy in the page cache.
+
+SCORE_COLUMNS = ["lnFatalities", "OCoDi", "HGI4", "Vader", "Wordscores", "Wordfish", "ConfliBERT", "CAMEO",
+                 "FI_Score"]
+CSV_DTYPES = {"iso3": "category", "yearmon": "str", "year": "int16", "month": "int8",
+              **{score: "float32" for score in SCORE_COLUMNS}}
+CACHE_DIR_NAME = ".cache"
+MMAP_SUFFIX = ".mmap"
+MMAP_INDEX = "index.json"
+
+_version_memo = {}
+
+
+def dataset_version(path):
+    # Content hash of the file, only recomputed when its mtime or size changes
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    if memo_key not in _version_memo:
+        sha = hashlib.sha1()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                sha.update(block)
+        _version_memo[memo_key] = sha.hexdigest()[:16]
+    return _version_memo[memo_key]
+
+
+def cache_file(path, name, version, suffix):
+    # Versioned file in the cache folder next to the data file at `path`
+    return os.path.join(os.path.dirname(path), CACHE_DIR_NAME, f"{name}-{version}{suffix}")
+
+
+def _remove_cache_file(path):
+    if os.path.isdir(path):
+        shutil.rmtree(path)
+    elif os.path.exists(path):
+        os.remove(path)
+
+
+def write_cache_file(cache_path, write):
+    # Disk caches are optional: if writing fails (missing pyarrow, read-only data folder) callers just
+    # keep using the slower path. Older versions of the same file are removed after a successful write.
+    # `write` may create a file or a folder.
+    cache_dir, file_name = os.path.split(cache_path)
+    name = file_name.rsplit("-", 1)[0]
+    suffix = os.path.splitext(file_name)[1]
+    tmp_path = f"{cache_path}.{os.getpid()}.tmp"
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        write(tmp_path)
+        if os.path.isdir(tmp_path):
+            _remove_cache_file(cache_path)
+        os.replace(tmp_path, cache_path)
+        for other in os.listdir(cache_dir):
+            other_version = other[len(name) + 1:-len(suffix)]
+            if (other.startswith(f"{name}-") and other.endswith(suffix) and "-" not in other_version
+                    and other != file_name):
+                _remove_cache_file(os.path.join(cache_dir, other))
+    except (ImportError, OSError, ValueError):
+        _remove_cache_file(tmp_path)
+
+
+def mmap_path(path, version):
+    # Folder of the memory-mapped copy of the dataset at `path` for one dataset version
+    return cache_file(path, os.path.splitext(os.path.basename(path))[0], version, MMAP_SUFFIX)
+
+
+def write_mmap_frame(df, out_dir):
+    # One .npy file per column plus an index; string and categorical columns are stored as integer
+    # codes with their categories in the index, so every column can be memory-mapped
+    os.makedirs(out_dir)
+    columns = []
+    for i, name in enumerate(df.columns):
+        values = df[name]
+        entry = {"name": name, "file": f"{i}.npy"}
+        if values.dtype == object:
+            values = values.astype("category")
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            entry["categories"] = values.cat.categories.tolist()
+            values = values.cat.codes
+        np.save(os.path.join(out_dir, entry["file"]), values.to_numpy(), allow_pickle=False)
+        columns.append(entry)
+    with open(os.path.join(out_dir, MMAP_INDEX), "w") as f:
+        json.dump({"n_rows": len(df), "columns": columns}, f)
+
+
+def read_mmap_frame(in_dir):
+    # Columns are read-only views of the mapped files; pages are loaded on first access and shared with
+    # every other process mapping the same files. Returns None if the folder is missing or incomplete.
+    try:
+        with open(os.path.join(in_dir, MMAP_INDEX)) as f:
+            index = json.load(f)
+        data = {}
+        for entry in index["columns"]:
+            # Plain ndarray view of the np.memmap, so results of operations on it are ordinary arrays
+            values = np.asarray(np.load(os.path.join(in_dir, entry["file"]), mmap_mode="r", allow_pickle=False))
+            if "categories" in entry:
+                values = pd.Categorical.from_codes(values, categories=entry["categories"], validate=False)
+            data[entry["name"]] = values
+    except (OSError, ValueError, KeyError):
+        return None
+    return pd.DataFrame(data, copy=False)
+
+
+def read_dataset(path, version, read):
+    # The memory-mapped copy of this dataset version if one was built, else read(path)
+    df = read_mmap_frame(mmap_path(path, version))
+    return read(path) if df is None else df
+
+
+def read_score_csv(path):
+    df = pd.read_csv(path, usecols=list(CSV_DTYPES), dtype=CSV_DTYPES)
+    df.insert(1, "DATE", pd.to_datetime(df.pop("yearmon"), format="%Y-%m"))
+    return df.sort_values(["iso3", "DATE"], kind="stable", ignore_index=True)
+
+
+def _read_cache_file(cache_path):
+    try:
+        return pd.read_parquet(cache_path)
+    except (ImportError, OSError, ValueError):
+        return None
+
+
+@shared_resource(max_entries=4)
+def _load_score_store(path, version, persist=True):
+    df = read_mmap_frame(mmap_path(path, version)) if persist else None
+    if df is not None:
+        return df
+    stem = os.path.splitext(os.path.basename(path))[0]
+    cache_path = cache_file(path, stem, version, ".parquet")
+    df = _read_cache_file(cache_path) if persist and os.path.exists(cache_path) else None
+    if df is None:
+        df = read_score_csv(path)
+        if persist:
+            write_cache_file(cache_path, lambda tmp_path: df.to_parquet(tmp_path, index=False))
+    return df
+
+
+def load_score_store(path, persist=True):
+    return _load_score_store(path, dataset_version(path), persist)
+
+
+class ScoreIndex:
+    # Lookup engine over the score store: rows are sorted by (iso3, DATE), so every country is a
+    # contiguous block and a date range inside it is found by binary search.
+
+    def __init__(self, df):
+        self.df = df
+        self.dates = df["DATE"].to_numpy()
+        codes = df["iso3"].cat.codes.to_numpy()
+        bounds = np.flatnonzero(np.diff(codes)) + 1
+        starts = np.concatenate(([0], bounds))
+        stops = np.concatenate((bounds, [len(df)]))
+        categories = df["iso3"].cat.categories
+        self.blocks = {categories[codes[start]]: (start, stop) for start, stop in zip(starts, stops) if stop > start}
+
+    def rows(self, country, start_date, end_date):
+        block_start, block_stop = self.blocks.get(country, (0, 0))
+        dates = self.dates[block_start:block_stop]
+        lo = 0 if start_date is None else np.searchsorted(dates, pd.Timestamp(start_date).to_datetime64(), side="left")
+        hi = len(dates) if end_date is None else np.searchsorted(dates, pd.Timestamp(end_date).to_datetime64(),
+                                                                 side="right")
+        return block_start + lo, block_start + max(lo, hi)
+
+    def countries_frame(self, countries, list_scores, start_date=None, end_date=None):
+        # Wide rows (iso3, DATE, scores...) of several countries, ordered by country and date
+        scores = [score for score in SCORE_COLUMNS if score in list_scores]
+        positions = [np.arange(*self.rows(country, start_date, end_date)) for country in sorted(set(countries))]
+        positions = np.concatenate(positions) if positions else np.empty(0, dtype="int64")
+        # Rows first, column by column: selecting the columns first would copy them in full
+        frame = pd.concat([self.df[column].take(positions) for column in ["iso3", "DATE"] + scores], axis=1)
+        return frame.astype({"iso3": str}).reset_index(drop=True)
+
+    def country_scores(self, country, list_scores, start_date, end_date):
+        lo, hi = self.rows(country, start_date, end_date)
+        scores = [score for score in SCORE_COLUMNS if score in list_scores]
+        n_rows = hi - lo
+        return pd.DataFrame({
+            "DATE": np.tile(self.dates[lo:hi], len(scores)),
+            "iso3": np.repeat(country, n_rows * len(scores)),
+            "SCORE_NAME": np.repeat(scores, n_rows),
+            "SCORE_VALUE": np.concatenate([self.df[score].to_numpy()[lo:hi] for score in scores] or
+                                          [np.empty(0, dtype="float32")]),
+        })
+
+
+@shared_resource(max_entries=4)
+def _load_score_index(path, version):
+    return ScoreIndex(load_score_store(path))
+
+
+def load_score_index(path):
+    return _load_score_index(path, dataset_version(path))
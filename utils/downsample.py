@@ -0,0 +1,60 @@
+import numpy as np
+
+# Shape-preserving decimation of line series to a point budget, so charts with many long series send
+# about as many points as the chart has pixels. Both functions return sorted row positions into the
+# input, so any other column of the rows (e.g. hover values) can be taken along. Missing values are
+# skipped, except the first one of every gap, which keeps the gap visible in the line.
+
+
+def _gap_starts(finite):
+    return np.flatnonzero(~finite & np.concatenate(([True], finite[:-1])))
+
+
+def lttb_indices(x, y, n_out):
+    # Largest-Triangle-Three-Buckets: first and last point, then per bucket the point spanning the largest
+    # triangle with the point kept in the previous bucket and the mean of the next bucket
+    x = np.asarray(x, dtype="float64")
+    y = np.asarray(y, dtype="float64")
+    finite = np.isfinite(y)
+    points = np.flatnonzero(finite)
+    if len(points) <= max(n_out, 2):
+        return np.arange(len(y))
+    px, py = x[points], y[points]
+    edges = np.linspace(1, len(points) - 1, n_out - 1).astype(np.int64)
+    # Mean of every bucket, the last point counting as a bucket of its own
+    counts = np.diff(np.append(edges, len(points)))
+    mean_x = np.add.reduceat(px, edges) / counts
+    mean_y = np.add.reduceat(py, edges) / counts
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0], selected[-1] = 0, len(points) - 1
+    for i in range(n_out - 2):
+        lo, hi = edges[i], edges[i + 1]
+        a = selected[i]
+        areas = np.abs((px[a] - mean_x[i + 1]) * (py[lo:hi] - py[a]) - (px[a] - px[lo:hi]) * (mean_y[i + 1] - py[a]))
+        selected[i + 1] = lo + int(np.argmax(areas))
+    return np.union1d(points[selected], _gap_starts(finite))
+
+
+def minmax_indices(y, n_out):
+    # Lowest and highest point of n_out // 2 equal buckets, plus the first and last point
+    y = np.asarray(y, dtype="float64")
+    finite = np.isfinite(y)
+    points = np.flatnonzero(finite)
+    if len(points) <= max(n_out, 2):
+        return np.arange(len(y))
+    n_buckets = max(n_out // 2, 1)
+    bucket = np.arange(len(points)) * n_buckets // len(points)
+    order = np.lexsort((y[points], bucket))
+    bounds = np.flatnonzero(np.diff(bucket[order])) + 1
+    lows = order[np.concatenate(([0], bounds))]
+    highs = order[np.concatenate((bounds - 1, [len(order) - 1]))]
+    kept = points[np.concatenate((lows, highs, [0, len(points) - 1]))]
+    return np.union1d(kept, _gap_starts(finite))
+
+
+def downsample_indices(x, y, n_out, method="lttb"):
+    if method == "lttb":
+        return lttb_indices(x, y, n_out)
+    if method == "minmax":
+        return minmax_indices(y, n_out)
+    raise ValueError(f"Unknown downsampling method: {method}")
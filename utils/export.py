@@ -0,0 +1,144 @@
+import glob
+import hashlib
+import importlib.util
+import os
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from utils.resources import shared_resource
+
+# Data downloads of the current selection. Exports are written chunk by chunk from a generator of frames
+# (see iter_score_series/iter_predictions), so only one chunk is held in memory at a time. The app writes
+# them to a temporary file named after the selection and dataset version on a background thread, which
+# later requests for the same selection reuse; the API streams the same bytes directly to the client.
+
+EXPORT_FORMATS = {
+    "csv": ("text/csv", ".csv"),
+    "parquet": ("application/vnd.apache.parquet", ".parquet"),
+}
+EXPORT_DIR = os.path.join(tempfile.gettempdir(), "ocodi-exports")
+# Export files unused for this long are removed when the next export is written
+EXPORT_TTL = 60 * 60
+# Exports written at the same time per process
+EXPORT_WORKERS = 2
+# Selections with at least this many rows are downloaded from the data API when the app knows its URL,
+# instead of being written to a file and sent through the session
+EXPORT_LINK_ROWS = 100_000
+
+
+def available_formats():
+    # Parquet needs pyarrow, which only the API requirements install
+    return [fmt for fmt in EXPORT_FORMATS if fmt != "parquet" or importlib.util.find_spec("pyarrow") is not None]
+
+
+def iter_csv(chunks):
+    header = True
+    for chunk in chunks:
+        yield chunk.to_csv(index=False, header=header, date_format="%Y-%m-%d").encode()
+        header = False
+
+
+class _Sink:
+    # Write-only file object that hands out what was written since the last drain
+
+    def __init__(self):
+        self.parts = []
+        self.position = 0
+        self.closed = False
+
+    def write(self, data):
+        self.parts.append(bytes(data))
+        self.position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self.position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        data = b"".join(self.parts)
+        self.parts = []
+        return data
+
+
+def iter_parquet(chunks):
+    # One row group per chunk; the footer follows the last one
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    sink = _Sink()
+    writer = None
+    for chunk in chunks:
+        table = pa.Table.from_pandas(chunk, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema)
+        writer.write_table(table.cast(writer.schema))
+        yield sink.drain()
+    if writer is not None:
+        writer.close()
+    yield sink.drain()
+
+
+def iter_export(chunks, fmt):
+    if fmt == "csv":
+        return iter_csv(chunks)
+    if fmt == "parquet":
+        return iter_parquet(chunks)
+    raise ValueError(f"Unknown export format '{fmt}', expected one of {list(EXPORT_FORMATS)}")
+
+
+def _remove_expired():
+    now = time.time()
+    for path in glob.glob(os.path.join(EXPORT_DIR, "*")):
+        try:
+            if now - os.path.getmtime(path) > EXPORT_TTL:
+                os.remove(path)
+        except OSError:
+            pass
+
+
+def export_file(make_chunks, fmt, key):
+    # Path of the export for `key` (selection and dataset version), written from make_chunks() unless
+    # a file for the same key exists already
+    os.makedirs(EXPORT_DIR, exist_ok=True)
+    path = os.path.join(EXPORT_DIR, hashlib.sha1(repr((key, fmt)).encode()).hexdigest()[:24] + EXPORT_FORMATS[fmt][1])
+    if os.path.exists(path):
+        os.utime(path)
+        return path
+    _remove_expired()
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            for data in iter_export(make_chunks(), fmt):
+                f.write(data)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return path
+
+
+@shared_resource()
+def _export_jobs():
+    return {"lock": threading.Lock(), "jobs": {},
+            "executor": ThreadPoolExecutor(max_workers=EXPORT_WORKERS, thread_name_prefix="export")}
+
+
+def submit_export(make_chunks, fmt, key):
+    # Future of export_file() on a background thread, so the caller can poll for the path instead of
+    # waiting; sessions asking for the same export while it is written share one job
+    registry = _export_jobs()
+    with registry["lock"]:
+        registry["jobs"] = {job: future for job, future in registry["jobs"].items() if not future.done()}
+        future = registry["jobs"].get((key, fmt))
+        if future is None:
+            future = registry["executor"].submit(export_file, make_chunks, fmt, key)
+            registry["jobs"][(key, fmt)] = future
+    return future
@@ -1,14 +1,15 @@
-import streamlit as st
 import os
 import base64
 
-@st.cache_resource
+from utils.resources import shared_resource
+
+@shared_resource()
 def get_base64_of_bin_file(bin_file):
     with open(bin_file, 'rb') as f:
         data = f.read()
     return base64.b64encode(data).decode()
 
-@st.cache_resource
+@shared_resource()
 def get_img_with_href(local_img_path, target_url):
     img_format = os.path.splitext(local_img_path)[-1].replace('.', '')
     bin_str = get_base64_of_bin_file(local_img_path)
@@ -1,88 +1,313 @@
-import streamlit as st
 import pandas as pd
 import numpy as np
 import json
+import logging
+
+from utils.aggregates import load_aggregate_cube
+from utils.correlations import load_correlation_engine
+from utils.data_store import SCORE_COLUMNS, dataset_version, load_score_index, load_score_store, read_dataset
+from utils.downsample import downsample_indices
+from utils.metrics import instrument
+from utils.rankings import load_ranking_engine
+from utils.resources import data_cache, shared_resource
+
+logger = logging.getLogger(__name__)
+
+SCORE_TABLE_COLUMNS = ["lnFatalities", "OCoDi", "HGI4", "Vader", "Wordscores", "Wordfish", "ConfliBERT", "CAMEO"]
+
+# Memory budget and lifetime of the cached query results, per function
+MiB = 2 ** 20
+QUERY_TTL = 60 * 60
+
+# Point budget of the Country Comparison chart: above MAX_LINE_POINTS the series are decimated to
+# about MAX_LINE_POINTS in total, never to fewer than MIN_SERIES_POINTS or more than CHART_WIDTH_PX
+# points per series
+MAX_LINE_POINTS = 10000
+MIN_SERIES_POINTS = 50
+CHART_WIDTH_PX = 1200
+# Rows per chunk of the streamed exports
+EXPORT_CHUNK_ROWS = 50000
+
+
+def _version_of(*names):
+    return lambda params: tuple(dataset_version(params[name]) for name in names)
+
+
+def _month_start(date, shift=0):
+    months = date.year * 12 + date.month - 1 + shift
+    return pd.Timestamp(months // 12, months % 12 + 1, 1)
+
+
+def _month_end(date, shift=0):
+    return _month_start(date, shift + 1) - pd.Timedelta(days=1)
+
+
+def _snap_dates(start_date, end_date, agg_period):
+    # Narrowest month-aligned range selecting the same rows, so nearby slider positions share a cache
+    # entry: monthly rows are dated on the 1st, quarterly/yearly rows on the last day of their period.
+    start_date = None if start_date is None else pd.Timestamp(start_date)
+    end_date = None if end_date is None else pd.Timestamp(end_date)
+    if agg_period == "monthly":
+        if start_date is not None:
+            start_date = _month_start(start_date, 0 if _month_start(start_date) >= start_date else 1)
+        if end_date is not None:
+            end_date = _month_start(end_date)
+    else:
+        if start_date is not None:
+            start_date = _month_end(start_date, 0 if _month_end(start_date) >= start_date else 1)
+        if end_date is not None:
+            end_date = _month_end(end_date, 0 if _month_end(end_date) <= end_date else -1)
+    return start_date, end_date
+
+
+def normalize_query(params):
+    # Canonical score order, sorted unique countries and month-aligned dates
+    params = dict(params)
+    if "list_scores" in params:
+        params["list_scores"] = tuple(score for score in SCORE_COLUMNS if score in set(params["list_scores"]))
+    if params.get("countries") is not None:
+        params["countries"] = tuple(sorted(set(params["countries"])))
+    if "start_date" in params:
+        params["start_date"], params["end_date"] = _snap_dates(params["start_date"], params["end_date"],
+                                                               params.get("agg_period", "monthly"))
+    return params
+
 
 # Auxiliary functions for streamlit frontend
-@st.cache_data
+@instrument
+@data_cache(max_bytes=64 * MiB, version=_version_of("temp_path"))
 def load_polarity_country_list(temp_path):
     return pd.read_csv(temp_path)
 
 
-@st.cache_data
+@instrument
+@data_cache(max_bytes=64 * MiB, version=_version_of("temp_path"))
 def load_full_dataset(temp_path):
     return pd.read_csv(temp_path)
 
 
-@st.cache_data
+@instrument
+@data_cache(max_bytes=16 * MiB, version=_version_of("temp_path"))
 def load_countries(temp_path):
     return pd.read_csv(temp_path)
 
 
+def read_country_names_csv(temp_path):
+    df_countries = pd.read_csv(temp_path, usecols=["alpha3", "name"])
+    return pd.DataFrame({"ISO_A3": df_countries["alpha3"].str.upper(), "CountryName": df_countries["name"]})
+
+
+@shared_resource(max_entries=4)
+def _load_country_names(temp_path, version):
+    df_countries = read_dataset(temp_path, version, read_country_names_csv)
+    return pd.Series(np.asarray(df_countries["CountryName"], dtype=object),
+                     index=pd.Index(np.asarray(df_countries["ISO_A3"], dtype=object), name="ISO_A3"),
+                     name="CountryName")
+
+
+@instrument
+def load_country_names(temp_path):
+    # Country dimension: country names indexed by upper-case ISO3 code, shared by all sessions
+    return _load_country_names(temp_path, dataset_version(temp_path))
+
+
+@instrument
+def resolve_country_names(codes, country_names):
+    # Vectorized lookup; codes without a name are logged once per call and shown as the code itself
+    codes = pd.Series(codes, dtype="category")
+    names = codes.map(country_names)
+    unknown = codes.cat.categories.difference(country_names.index)
+    if len(unknown):
+        logger.warning("No country name for ISO3 code(s): %s", ", ".join(unknown))
+        names = names.astype(object).fillna(codes.astype(object))
+    return names.astype(object)
+
+
+def read_predictions_csv(temp_path):
+    df = pd.read_csv(temp_path, usecols=["iso3", "yearmon", "predicted_fatalities"])
+    df["DATE"] = pd.to_datetime(df["yearmon"], format="%Y-%m")
+    return df.sort_values(["iso3", "DATE"], ignore_index=True)
+
+
+@shared_resource(max_entries=4)
+def _load_predictions(temp_path, version):
+    return read_dataset(temp_path, version, read_predictions_csv)
+
+
+@instrument
+def load_predictions(temp_path):
+    return _load_predictions(temp_path, dataset_version(temp_path))
+
+
+@instrument
+@data_cache(max_bytes=1 * MiB, version=_version_of("temp_path"))
+def load_prediction_periods(temp_path):
+    return [str(year) for year in np.unique(load_predictions(temp_path)["DATE"].dt.year)]
 
-@st.cache_data
-def create_high_low_list(path_full_scaled, dict_countries, year=2022, n=5):
-    df = pd.read_csv(path_full_scaled, header=0, usecols=['iso3', "yearmon", "OCoDi"])
-    df = df.rename(columns={"iso3": "ISO_A3"})
-    df['DATE'] = pd.to_datetime(df['yearmon'])
-    df = df.set_index('DATE')
-    mean_df = df.groupby([df.index.year, 'ISO_A3'])['OCoDi'].mean()
-    mean_df = mean_df.reset_index()
-    year_df = mean_df[mean_df['DATE'] == year].sort_values('OCoDi')
-    top_bottom_df = pd.concat([year_df.head(n), year_df.tail(n)])
-    top_bottom_df["CountryName"] = top_bottom_df["ISO_A3"].map(lambda x: dict_countries[x.lower()])
-    rank = top_bottom_df['OCoDi'].rank(method='dense', ascending=False)
-    top_bottom_df['Highest_Lowest'] = rank.apply(lambda x: 'highest' if x <= n else 'lowest')
+
+@instrument
+@data_cache(max_bytes=4 * MiB, ttl=QUERY_TTL, version=_version_of("path_full_scaled", "path_countries"))
+def create_high_low_list(path_full_scaled, path_countries, year=2022, n=5, score="OCoDi", stat="mean"):
+    top_bottom_df = load_ranking_engine(path_full_scaled).ranking(score, year, n, stat)
+    top_bottom_df.insert(3, "CountryName", resolve_country_names(top_bottom_df["ISO_A3"],
+                                                                 load_country_names(path_countries)).to_numpy())
     return top_bottom_df
 
 
-@st.cache_data
+@instrument
+def load_ranking_years(path_full_scaled):
+    return load_ranking_engine(path_full_scaled).years.tolist()
+
+
+@instrument
+@data_cache(max_bytes=64 * MiB, version=_version_of("temp_path"))
 def preprocess_score_table(temp_path):
-    df_score = pd.read_csv(temp_path)
-    df_score["DATE"] = pd.to_datetime(df_score["yearmon"])
-    df = df_score[["iso3", "year", "DATE", "lnFatalities", "OCoDi", "HGI4", "Vader", "Wordscores",
-                   "Wordfish", "ConfliBERT", "CAMEO"]]
-    return df
-
-
-@st.cache_data
-def preprocess_country_table(temp_path, list_scores, country, start_date, end_date):
-    df_country = pd.read_csv(temp_path)
-    df_country["DATE"] = pd.to_datetime(df_country["yearmon"])
-    df_country_sel = df_country[
-        (df_country["iso3"] == country) &
-        (df_country["DATE"] <= end_date) &
-        (df_country["DATE"] >= start_date)
-        ]
-    df_country_sel = df_country_sel.drop(columns=["yearmon", "year", "month"])
-    df_country_sel = df_country_sel.melt(id_vars=["DATE", "iso3"],
-                                         var_name="SCORE_NAME",
-                                         value_name="SCORE_VALUE")
-    return df_country_sel[df_country_sel["SCORE_NAME"].isin(list_scores)]
-
-
-@st.cache_data
-def groupby_scores_time_agg(df, agg_period="yearly"):
+    df_score = load_score_store(temp_path)
+    # Plain strings for iso3: px.line fails to group a filtered frame on the store's categorical codes
+    return df_score[["iso3", "year", "DATE"] + SCORE_TABLE_COLUMNS].astype({"iso3": str})
+
+
+@instrument
+@data_cache(max_bytes=32 * MiB, ttl=QUERY_TTL, normalize=normalize_query, version=_version_of("temp_path"))
+def preprocess_country_table(temp_path, list_scores, country, start_date, end_date, agg_period="monthly"):
+    if agg_period == "monthly":
+        return load_score_index(temp_path).country_scores(country, list_scores, start_date, end_date)
+    scores = [score for score in SCORE_TABLE_COLUMNS if score in list_scores]
+    df_country = load_aggregate_cube(temp_path).country_table(agg_period, country, start_date, end_date)[scores]
+    df_country = df_country.reset_index().melt(id_vars=["DATE"], var_name="SCORE_NAME", value_name="SCORE_VALUE")
+    df_country.insert(1, "iso3", country)
+    return df_country
+
+
+@instrument
+@data_cache(max_bytes=64 * MiB, version=_version_of("temp_path"))
+def groupby_scores_time_agg(temp_path, agg_period="yearly"):
+    if agg_period == "monthly":
+        return preprocess_score_table(temp_path)
+    cube = load_aggregate_cube(temp_path)
+    grouped = cube.table(agg_period, "mean")[SCORE_TABLE_COLUMNS].copy()
+    grouped["CAMEO"] = cube.table(agg_period, "sum")["CAMEO"]
+    return grouped.reset_index()
+
+
+def _date_mask(dates, start_date, end_date):
+    mask = np.ones(len(dates), dtype=bool)
+    if start_date is not None:
+        mask &= (dates >= start_date).to_numpy()
+    if end_date is not None:
+        mask &= (dates <= end_date).to_numpy()
+    return mask
+
+
+@instrument
+@data_cache(max_bytes=64 * MiB, ttl=QUERY_TTL, normalize=normalize_query, version=_version_of("temp_path"))
+def select_score_series(temp_path, countries, list_scores, start_date=None, end_date=None, agg_period="monthly"):
+    # Wide (iso3, DATE, scores...) rows for many countries and scores at once, with the same
+    # aggregation as groupby_scores_time_agg
+    return _score_series(temp_path, countries, list_scores, start_date, end_date, agg_period)
+
+
+def _score_series(temp_path, countries, list_scores, start_date, end_date, agg_period):
     if agg_period == "monthly":
-        return df
-    elif agg_period == "yearly":
-        grouped = df.groupby(
-            [
-                pd.Grouper(key="iso3"),
-                pd.Grouper(key="DATE", freq="Y")
-            ]
-        ).agg(
-            lnFatalities=pd.NamedAgg(column="lnFatalities", aggfunc=np.mean),
-            OCoDi=pd.NamedAgg(column="OCoDi", aggfunc=np.mean),
-            HGI4=pd.NamedAgg(column="HGI4", aggfunc=np.mean),
-            Vader=pd.NamedAgg(column="Vader", aggfunc=np.mean),
-            Wordscores=pd.NamedAgg("Wordscores", aggfunc=np.mean),
-            Wordfish=pd.NamedAgg(column="Wordfish", aggfunc=np.mean),
-            ConfliBERT=pd.NamedAgg(column="ConfliBERT", aggfunc=np.mean),
-            CAMEO=pd.NamedAgg("CAMEO", aggfunc="sum")
-        )
-        return grouped.reset_index()
+        return load_score_index(temp_path).countries_frame(countries, list_scores, start_date, end_date)
+    scores = [score for score in SCORE_TABLE_COLUMNS if score in list_scores]
+    df = groupby_scores_time_agg(temp_path, agg_period)
+    mask = df["iso3"].isin(countries).to_numpy() & _date_mask(df["DATE"], start_date, end_date)
+    return df.loc[mask, ["iso3", "DATE"] + scores].reset_index(drop=True)
+
+
+def _series_values(temp_path, country, score, start_date, end_date, agg_period):
+    if agg_period == "monthly":
+        index = load_score_index(temp_path)
+        lo, hi = index.rows(country, start_date, end_date)
+        return index.dates[lo:hi], index.df[score].to_numpy()[lo:hi]
+    df = _score_series(temp_path, [country], [score], start_date, end_date, agg_period)
+    return df["DATE"].to_numpy(), df[score].to_numpy()
+
+
+@instrument
+@data_cache(max_bytes=16 * MiB, ttl=QUERY_TTL, normalize=normalize_query, version=_version_of("temp_path"))
+def select_downsampled_rows(temp_path, country, score, start_date, end_date, agg_period, n_out, method="lttb"):
+    # Positions of the rows kept when one country's series is decimated to n_out points, cached per
+    # country so a changed country selection only decimates the added countries
+    dates, values = _series_values(temp_path, country, score, start_date, end_date, agg_period)
+    return downsample_indices(dates.astype("int64"), values, n_out, method)
+
+
+@instrument
+def select_country_comparison(temp_path, countries, score, start_date=None, end_date=None, agg_period="monthly",
+                              max_points=MAX_LINE_POINTS, width_px=CHART_WIDTH_PX, method="lttb"):
+    # Rows to draw for the Country Comparison chart and the number of rows at full resolution. Short
+    # ranges and few countries stay at full resolution.
+    df = select_score_series(temp_path, countries, [score, "lnFatalities"], start_date, end_date, agg_period)
+    if len(df) <= max_points:
+        return df, len(df)
+    iso3 = df["iso3"].to_numpy()
+    starts = np.concatenate(([0], np.flatnonzero(iso3[1:] != iso3[:-1]) + 1))
+    n_out = min(width_px, max(MIN_SERIES_POINTS, max_points // len(starts)))
+    positions = [start + select_downsampled_rows(temp_path, iso3[start], score, start_date, end_date, agg_period,
+                                                 n_out, method)
+                 for start in starts]
+    return df.take(np.concatenate(positions)).reset_index(drop=True), len(df)
+
+
+@instrument
+@data_cache(max_bytes=32 * MiB, ttl=QUERY_TTL, normalize=normalize_query, version=_version_of("temp_path"))
+def select_score_aggregates(temp_path, countries, list_scores, start_date=None, end_date=None, agg_period="yearly",
+                            stat="mean"):
+    scores = [score for score in SCORE_TABLE_COLUMNS if score in list_scores]
+    df = load_aggregate_cube(temp_path).table(agg_period, stat)[scores].reset_index()
+    mask = df["iso3"].isin(countries).to_numpy() & _date_mask(df["DATE"], start_date, end_date)
+    return df[mask].reset_index(drop=True)
+
+
+@instrument
+@data_cache(max_bytes=16 * MiB, ttl=QUERY_TTL, normalize=normalize_query, version=_version_of("temp_path"))
+def select_predictions(temp_path, countries=None, start_date=None, end_date=None):
+    df = load_predictions(temp_path)
+    mask = _date_mask(df["DATE"], start_date, end_date)
+    if countries is not None:
+        mask &= df["iso3"].isin(countries).to_numpy()
+    return df.loc[mask, ["iso3", "DATE", "predicted_fatalities"]].astype({"iso3": str}).reset_index(drop=True)
+
+
+@instrument
+@data_cache(max_bytes=16 * MiB, ttl=QUERY_TTL, normalize=normalize_query, version=_version_of("temp_path"))
+def select_rolling_metric(temp_path, country, list_scores, metric="corr", window=12, start_date=None, end_date=None):
+    # Rolling correlation or fit error of each score against lnFatalities for one country
+    return load_correlation_engine(temp_path).rolling(country, list_scores, metric, window, start_date, end_date)
+
+
+@instrument
+@data_cache(max_bytes=4 * MiB, version=_version_of("temp_path"))
+def load_metric_summary(temp_path, metric="corr"):
+    return load_correlation_engine(temp_path).summary(metric)
 
 
+# Streamed exports: the rows of select_score_series/select_predictions as frames of about chunk_rows
+# rows, read from the shared stores without building (or caching) the full result
+def iter_score_series(temp_path, countries, list_scores, start_date=None, end_date=None, agg_period="monthly",
+                      chunk_rows=EXPORT_CHUNK_ROWS):
+    # Whole countries per chunk, batched by their number of monthly rows (an upper bound for longer periods)
+    index = load_score_index(temp_path)
+    batch, batch_rows, n_chunks = [], 0, 0
+    for country in sorted(set(countries)):
+        lo, hi = index.rows(country, start_date, end_date)
+        batch.append(country)
+        batch_rows += hi - lo
+        if batch_rows >= chunk_rows:
+            yield _score_series(temp_path, batch, list_scores, start_date, end_date, agg_period)
+            batch, batch_rows, n_chunks = [], 0, n_chunks + 1
+    if batch or not n_chunks:
+        yield _score_series(temp_path, batch, list_scores, start_date, end_date, agg_period)
 
 
+def iter_predictions(temp_path, countries=None, start_date=None, end_date=None, chunk_rows=EXPORT_CHUNK_ROWS):
+    df = load_predictions(temp_path)
+    mask = _date_mask(df["DATE"], start_date, end_date)
+    if countries is not None:
+        mask &= df["iso3"].isin(countries).to_numpy()
+    positions = np.flatnonzero(mask)
+    for start in range(0, max(len(positions), 1), chunk_rows):
+        chunk = df.iloc[positions[start:start + chunk_rows]]
+        yield chunk[["iso3", "DATE", "predicted_fatalities"]].astype({"iso3": str}).reset_index(drop=True)
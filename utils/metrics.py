@@ -0,0 +1,205 @@
+import bisect
+import functools
+import logging
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from utils import resources
+
+# In-process instrumentation of the loaders, figure builders and page sections: call counts, wall
+# time histograms, rows returned and errors per function, plus size and hit/miss counts of every
+# shared cache. Recording a call costs two clock reads and a short lock, so it stays on in production.
+# The metrics are rendered in the Prometheus text format, served on OCODI_METRICS_PORT and/or written
+# to OCODI_METRICS_FILE (for a node_exporter textfile collector) every OCODI_METRICS_INTERVAL seconds.
+# Every process (app server, API worker) keeps its own metrics.
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_functions = {}
+_exporter_started = False
+
+
+class FunctionMetrics:
+
+    def __init__(self, module, name):
+        self.module = module
+        self.name = name
+        self.calls = 0
+        self.errors = 0
+        self.seconds = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+
+
+def _rows(result):
+    # Rows of a returned frame, array or list; of the first item for tuples like (df, n_points)
+    if isinstance(result, tuple):
+        result = result[0] if result else None
+    shape = getattr(result, "shape", None)
+    if shape:
+        return shape[0]
+    if isinstance(result, list):
+        return len(result)
+    return 0
+
+
+def instrument(func=None, name=None):
+    if func is None:
+        return lambda f: instrument(f, name)
+    # Functions decorated again (the app's sections on every script rerun) keep counting on the same
+    # metrics instead of starting from zero
+    key = (func.__module__, name or func.__qualname__)
+    with _lock:
+        metrics = _functions.get(key)
+        if metrics is None:
+            metrics = _functions[key] = FunctionMetrics(*key)
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        t0 = time.perf_counter()
+        failed = True
+        result = None
+        try:
+            result = func(*args, **kwargs)
+            failed = False
+            return result
+        finally:
+            seconds = time.perf_counter() - t0
+            with _lock:
+                metrics.calls += 1
+                metrics.errors += failed
+                metrics.seconds += seconds
+                metrics.rows += _rows(result)
+                metrics.buckets[bisect.bisect_left(LATENCY_BUCKETS, seconds)] += 1
+    wrapper.metrics = metrics
+    return wrapper
+
+
+def function_metrics():
+    with _lock:
+        return [{"module": m.module, "function": m.name, "calls": m.calls, "errors": m.errors,
+                 "seconds": m.seconds, "rows": m.rows, "buckets": list(m.buckets)} for m in _functions.values()]
+
+
+def cache_metrics():
+    # Caches without a byte budget hold long-lived objects that can grow after they were cached (the cube
+    # registry, memoized engine results), so their size is measured when the metrics are read
+    metrics = []
+    for cache in list(resources._caches):
+        with cache.lock:
+            values = None if cache.max_bytes is not None else [entry[0] for entry in cache.entries.values()]
+            metrics.append({"cache": cache.name, "entries": len(cache.entries), "bytes": cache.total_bytes,
+                            "max_bytes": cache.max_bytes, "hits": cache.hits, "misses": cache.misses,
+                            "evictions": cache.evictions})
+        if values is not None:
+            seen = set()
+            metrics[-1]["bytes"] = sum(resources.sizeof(value, seen) for value in values)
+    return metrics
+
+
+def _escape(label):
+    return str(label).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _sample(metric, labels, value):
+    label_text = ",".join(f'{key}="{_escape(label)}"' for key, label in labels.items())
+    return f"{metric}{{{label_text}}} {value}"
+
+
+def prometheus_text():
+    lines = []
+
+    def family(metric, kind, help_text, samples):
+        lines.append(f"# HELP {metric} {help_text}")
+        lines.append(f"# TYPE {metric} {kind}")
+        lines.extend(_sample(*sample) for sample in samples)
+
+    functions = [({"module": m["module"], "function": m["function"]}, m) for m in function_metrics()]
+    family("ocodi_function_calls_total", "counter", "Calls per instrumented function",
+           [("ocodi_function_calls_total", labels, m["calls"]) for labels, m in functions])
+    family("ocodi_function_errors_total", "counter", "Calls that raised an exception",
+           [("ocodi_function_errors_total", labels, m["errors"]) for labels, m in functions])
+    family("ocodi_function_rows_total", "counter", "Rows returned by the function",
+           [("ocodi_function_rows_total", labels, m["rows"]) for labels, m in functions])
+    histogram = []
+    for labels, m in functions:
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), m["buckets"]):
+            cumulative += count
+            histogram.append(("ocodi_function_seconds_bucket", {**labels, "le": bound}, cumulative))
+        histogram.append(("ocodi_function_seconds_sum", labels, m["seconds"]))
+        histogram.append(("ocodi_function_seconds_count", labels, m["calls"]))
+    family("ocodi_function_seconds", "histogram", "Wall time per call", histogram)
+
+    caches = [({"cache": c["cache"]}, c) for c in cache_metrics()]
+    for metric, kind, field, help_text in [
+        ("ocodi_cache_hits_total", "counter", "hits", "Cache lookups served from the cache"),
+        ("ocodi_cache_misses_total", "counter", "misses", "Cache lookups that computed the value"),
+        ("ocodi_cache_evictions_total", "counter", "evictions", "Entries evicted for the size or entry budget"),
+        ("ocodi_cache_entries", "gauge", "entries", "Entries currently cached"),
+        ("ocodi_cache_bytes", "gauge", "bytes", "Approximate size of the cached objects"),
+        ("ocodi_cache_max_bytes", "gauge", "max_bytes", "Size budget of the cache"),
+    ]:
+        family(metric, kind, help_text,
+               [(metric, labels, c[field]) for labels, c in caches if c[field] is not None])
+    return "\n".join(lines) + "\n"
+
+
+def write_metrics_file(path):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(prometheus_text())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", CONTENT_TYPE)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_exporter():
+    # Starts the configured exporters once per process; without OCODI_METRICS_PORT/FILE this is a no-op
+    global _exporter_started
+    with _lock:
+        if _exporter_started:
+            return
+        _exporter_started = True
+    port = os.environ.get("OCODI_METRICS_PORT")
+    if port:
+        try:
+            server = ThreadingHTTPServer(("0.0.0.0", int(port)), _MetricsHandler)
+        except OSError as e:
+            # e.g. the port is taken by another replica on the same host; the app runs without it
+            logger.warning("Could not serve metrics on port %s: %s", port, e)
+        else:
+            threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    path = os.environ.get("OCODI_METRICS_FILE")
+    if path:
+        interval = float(os.environ.get("OCODI_METRICS_INTERVAL", "15"))
+
+        def write_periodically():
+            while True:
+                try:
+                    write_metrics_file(path)
+                except OSError:
+                    pass
+                time.sleep(interval)
+        threading.Thread(target=write_periodically, name="metrics-file", daemon=True).start()
@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+
+from utils.aggregates import AGG_STATS, load_aggregate_cube
+from utils.data_store import SCORE_COLUMNS, dataset_version
+from utils.resources import shared_resource
+
+# Yearly country rankings for every score. The yearly cube tables are laid out once as dense
+# year x country matrices, so a top/bottom-k query is a partial selection over a single row.
+
+
+class RankingEngine:
+
+    def __init__(self, version, years, countries, values):
+        self.version = version
+        self.years = years
+        self.countries = countries
+        self.values = values
+        self._year_rows = {year: i for i, year in enumerate(years)}
+        # Country position in alphabetical order, the tie-breaker for equal values
+        self._country_order = np.argsort(np.argsort(countries, kind="stable"), kind="stable")
+
+    @classmethod
+    def build(cls, cube):
+        values = {}
+        years = countries = None
+        for stat in AGG_STATS:
+            table = cube.table("yearly", stat)
+            for score in SCORE_COLUMNS:
+                matrix = table[score].unstack("iso3")
+                if years is None:
+                    years = matrix.index.year.to_numpy()
+                    countries = matrix.columns.to_numpy(dtype=object)
+                matrix = matrix.reindex(columns=countries).to_numpy(dtype="float64")
+                values[(score, stat)] = matrix
+        return cls(cube.version, years, countries, values)
+
+    def _select(self, row, candidates, n, highest):
+        # Partial selection of the n best candidates, then a full ordering of just those by value and
+        # country order; every candidate tied with the n-th value is kept so ties never depend on argpartition.
+        if len(candidates) > n:
+            keys = -row[candidates] if highest else row[candidates]
+            kth = keys[np.argpartition(keys, n - 1)[n - 1]]
+            candidates = candidates[keys <= kth]
+        keys = -row[candidates] if highest else row[candidates]
+        order = np.lexsort((self._country_order[candidates], keys))
+        return candidates[order[:n]]
+
+    def _row(self, score, year, stat):
+        if (score, stat) not in self.values:
+            raise ValueError(f"Unknown score '{score}' or aggregation statistic '{stat}'")
+        if year not in self._year_rows:
+            return np.full(len(self.countries), np.nan)
+        return self.values[(score, stat)][self._year_rows[year]]
+
+    def top_bottom(self, score, year, n=5, stat="mean"):
+        # Column positions of the n highest (descending) and n lowest (ascending) countries; a country
+        # never appears in both, so with fewer than 2n countries the lowest list is shorter.
+        row = self._row(score, year, stat)
+        candidates = np.flatnonzero(~np.isnan(row))
+        highest = self._select(row, candidates, n, highest=True)
+        lowest = self._select(row, np.setdiff1d(candidates, highest), n, highest=False)
+        return highest, lowest
+
+    def ranking(self, score, year, n=5, stat="mean"):
+        # Same layout as before the engine existed: lowest ascending, then highest ascending
+        highest, lowest = self.top_bottom(score, year, n, stat)
+        positions = np.concatenate([lowest, highest[::-1]]).astype(int)
+        row = self._row(score, year, stat)
+        return pd.DataFrame({"DATE": np.full(len(positions), year, dtype="int32"),
+                             "ISO_A3": self.countries[positions],
+                             score: row[positions],
+                             "Highest_Lowest": ["lowest"] * len(lowest) + ["highest"] * len(highest)})
+
+
+@shared_resource(max_entries=4)
+def _load_ranking_engine(path, version):
+    return RankingEngine.build(load_aggregate_cube(path))
+
+
+def load_ranking_engine(path):
+    return _load_ranking_engine(path, dataset_version(path))
@@ -0,0 +1,199 @@
+import functools
+import inspect
+import sys
+import threading
+import time
+import types
+from collections import OrderedDict
+
+# Process-wide caches shared by every session. Unlike st.cache_resource/st.cache_data they also store
+# results computed outside a Streamlit session, so API workers, scripts and the warm-up step fill the
+# same caches the app reads from. Kept free of heavy imports so the page header can use it.
+# Cached values are shared, not copied: callers must treat them as read-only.
+
+_caches = []
+
+
+def sizeof(value, seen=None):
+    # Approximate memory footprint in bytes: buffer sizes for pandas/numpy objects, with Python objects
+    # in object columns estimated from a sample instead of walked one by one. Plotly figures count their
+    # trace, layout and frame data; other objects (engines, registries) their attributes. Objects
+    # referenced more than once are counted once.
+    seen = set() if seen is None else seen
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    if hasattr(value, "memory_usage") and hasattr(value, "dtypes"):
+        usage = value.memory_usage(index=True, deep=False)
+        total = int(usage.sum()) if hasattr(usage, "sum") else int(usage)
+        columns = [value] if not hasattr(value, "columns") else [value.iloc[:, i] for i in range(value.shape[1])]
+        for column in columns:
+            if column.dtype == object and len(column):
+                sample = column.iloc[:: max(1, len(column) // 64)]
+                total += len(column) * sum(sys.getsizeof(item) for item in sample) // len(sample)
+        return total
+    if hasattr(value, "nbytes"):
+        return int(value.nbytes)
+    if isinstance(value, (str, bytes, int, float, bool, type(None))):
+        return sys.getsizeof(value)
+    if isinstance(value, (list, tuple, set, frozenset)):
+        return sys.getsizeof(value) + sum(sizeof(item, seen) for item in value)
+    if isinstance(value, dict):
+        return sys.getsizeof(value) + sum(sizeof(key, seen) + sizeof(item, seen) for key, item in value.items())
+    if hasattr(value, "to_plotly_json") and hasattr(value, "_frame_objs"):
+        return sys.getsizeof(value) + sizeof([value._data, value._layout, [f._props for f in value._frame_objs]],
+                                             seen)
+    if isinstance(value, (type, types.ModuleType, types.FunctionType, types.MethodType)):
+        return sys.getsizeof(value)
+    attributes = [getattr(value, name) for name in getattr(type(value), "__slots__", ()) if hasattr(value, name)]
+    return sys.getsizeof(value) + sizeof(list(getattr(value, "__dict__", {}).values()) + attributes, seen)
+
+
+class LRUCache:
+    # Least recently used entries are evicted once the cache holds more than max_entries entries or
+    # max_bytes bytes; entries older than ttl seconds are dropped on access.
+
+    def __init__(self, name, max_entries=None, max_bytes=None, ttl=None):
+        self.name = name
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        # (True, value) on a hit, (False, None) on a miss
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and self.ttl is not None and time.monotonic() - entry[2] > self.ttl:
+                self._remove(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return False, None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return True, entry[0]
+
+    def peek(self, key):
+        # Like get(), without counting a hit or miss or refreshing the entry's position
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or (self.ttl is not None and time.monotonic() - entry[2] > self.ttl):
+                return False, None
+            return True, entry[0]
+
+    def put(self, key, value, nbytes=0):
+        with self.lock:
+            if key in self.entries:
+                self._remove(key)
+            if self.max_bytes is not None and nbytes > self.max_bytes:
+                return
+            self.entries[key] = (value, nbytes, time.monotonic())
+            self.total_bytes += nbytes
+            while self.entries and ((self.max_entries is not None and len(self.entries) > self.max_entries) or
+                                    (self.max_bytes is not None and self.total_bytes > self.max_bytes)):
+                self._remove(next(iter(self.entries)))
+                self.evictions += 1
+
+    def _remove(self, key):
+        _, nbytes, _ = self.entries.pop(key)
+        self.total_bytes -= nbytes
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.total_bytes = 0
+
+
+def shared_resource(max_entries=None):
+    # Long-lived objects (stores, indexes, figures), built once per key; concurrent callers of the same
+    # key wait for the first computation instead of repeating it
+    def decorator(func):
+        cache = LRUCache(f"{func.__module__}.{func.__qualname__}", max_entries=max_entries)
+        key_locks = {}
+        _caches.append(cache)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            key = (args, tuple(sorted(kwargs.items())))
+            found, value = cache.get(key)
+            if found:
+                return value
+            with cache.lock:
+                key_lock = key_locks.setdefault(key, threading.Lock())
+            with key_lock:
+                with cache.lock:
+                    if key in cache.entries:
+                        return cache.entries[key][0]
+                value = func(*args, **kwargs)
+                cache.put(key, value, sizeof(value))
+                with cache.lock:
+                    key_locks.pop(key, None)
+            return value
+
+        wrapper.cache = cache
+        wrapper.clear = cache.clear
+        return wrapper
+    return decorator
+
+
+def _hashable(value):
+    if isinstance(value, (list, tuple)):
+        return tuple(_hashable(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return tuple(sorted(_hashable(item) for item in value))
+    return value
+
+
+def data_cache(max_bytes, ttl=None, max_entries=None, normalize=None, version=None):
+    # Query results, bounded in bytes per function. `normalize` gets the bound arguments (defaults
+    # applied) and returns them in canonical form; the function is called with the canonical arguments,
+    # so equivalent queries share one entry. `version` maps the arguments to the version of the data
+    # they read, so results of an older dataset are never returned. Like shared_resource, concurrent
+    # misses on the same key wait for the first computation instead of repeating it.
+    def decorator(func):
+        cache = LRUCache(f"{func.__module__}.{func.__qualname__}", max_entries=max_entries, max_bytes=max_bytes,
+                         ttl=ttl)
+        key_locks = {}
+        signature = inspect.signature(func)
+        _caches.append(cache)
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            params = dict(bound.arguments)
+            if normalize is not None:
+                params = normalize(params)
+            key = tuple((name, _hashable(value)) for name, value in params.items())
+            if version is not None:
+                key += (version(params),)
+            found, value = cache.get(key)
+            if found:
+                return value
+            with cache.lock:
+                key_lock = key_locks.setdefault(key, threading.Lock())
+            with key_lock:
+                found, value = cache.peek(key)
+                if found:
+                    return value
+                value = func(**params)
+                cache.put(key, value, sizeof(value))
+                with cache.lock:
+                    key_locks.pop(key, None)
+            return value
+
+        wrapper.cache = cache
+        wrapper.clear = cache.clear
+        return wrapper
+    return decorator
+
+
+def clear_shared_resources():
+    for cache in _caches:
+        cache.clear()
@@ -1,12 +1,29 @@
-import pandas as pd
+import argparse
+import hashlib
+import os
+
+import numpy as np
+import plotly
 import plotly.express as px
+import plotly.graph_objects as go
+import plotly.io as pio
+
+from data import lists
+from data.lists import dict_scope
+from utils import aggregates, data_store, load_preprocess_data, rankings
+from utils.data_store import cache_file, dataset_version, write_cache_file
+from utils.load_preprocess_data import (create_high_low_list, load_country_names, load_prediction_periods,
+                                        load_predictions, resolve_country_names)
+from utils.metrics import instrument
+from utils.resources import shared_resource
 
 
-def load_world_map_fatalities(df, color, projection, scope, color_scale, dict_countries, max_fat):
-    df = df.iloc[:, 1:]
+@instrument
+def load_world_map_fatalities(df, color, projection, scope, color_scale, country_names, max_fat):
+    df = df[["iso3", "yearmon", color]]
     grouped = df.groupby(["iso3", "yearmon"]).sum().reset_index().sort_values(['yearmon'], ascending=False)
     grouped = grouped.rename(columns={"iso3": "ISO_A3"})
-    grouped["CountryName"] = grouped["ISO_A3"].map(lambda x: dict_countries[x.lower()])
+    grouped["CountryName"] = resolve_country_names(grouped["ISO_A3"], country_names).to_numpy()
     fig = px.choropleth(
         grouped[::-1],
         color=color,
@@ -31,7 +48,54 @@ def load_world_map_fatalities(df, color, projection, scope, color_scale, dict_co
     return fig
 
 
-def load_world_map_TopFlop(df_temp, projection, scope, color):
+def _animation_args(duration, redraw=True):
+    return {"frame": {"duration": duration, "redraw": redraw}, "mode": "immediate", "fromcurrent": True,
+            "transition": {"duration": duration, "easing": "linear"}}
+
+
+@instrument
+def load_world_map_fatalities_compact(df, color, projection, scope, color_scale, country_names, max_fat,
+                                      period=None):
+    # Same map as load_world_map_fatalities, but a single trace holds the location/hover index once and
+    # every frame only carries its z values. `period` (a year such as "2021") limits the figure to that
+    # chunk of frames. Values are rounded to the 2 decimals shown on hover before serialization, which is
+    # what keeps the JSON small.
+    matrix = df.groupby(["iso3", "yearmon"])[color].sum().unstack("yearmon")
+    if period is not None:
+        matrix = matrix.loc[:, matrix.columns.str.startswith(period)]
+    locations = matrix.index.tolist()
+    frame_names = matrix.columns.tolist()
+    frame_z = [np.round(matrix[name].to_numpy(), 2) for name in frame_names]
+    fig = go.Figure(
+        data=[go.Choropleth(locations=locations,
+                            z=frame_z[0] if frame_z else [],
+                            hovertext=resolve_country_names(locations, country_names).to_numpy(),
+                            hovertemplate="<b>%{hovertext}</b><br><br>Predicted Fatalities=%{z:.2f}<extra></extra>",
+                            coloraxis="coloraxis",
+                            name="")],
+        frames=[go.Frame(name=name, data=[go.Choropleth(z=z)], traces=[0]) for name, z in zip(frame_names, frame_z)]
+    )
+    fig.update_layout(
+        width=800,
+        height=600,
+        margin={"t": 60},
+        geo={"projection": {"type": projection}, "scope": scope},
+        coloraxis={"colorscale": color_scale, "cmin": 0, "cmax": max_fat,
+                   "colorbar": {"title": {"text": "Predicted Fatalities"}}},
+        updatemenus=[{"buttons": [{"args": [None, _animation_args(500)], "label": "&#9654;", "method": "animate"},
+                                  {"args": [[None], _animation_args(0)], "label": "&#9724;", "method": "animate"}],
+                      "direction": "left", "pad": {"r": 10, "t": 70}, "showactive": False, "type": "buttons",
+                      "x": 0.1, "xanchor": "right", "y": 0, "yanchor": "top"}],
+        sliders=[{"active": 0, "currentvalue": {"prefix": "Year & Month="}, "len": 0.9, "pad": {"b": 10, "t": 60},
+                  "x": 0.1, "xanchor": "left", "y": 0, "yanchor": "top",
+                  "steps": [{"args": [[name], _animation_args(0)], "label": name, "method": "animate"}
+                            for name in frame_names]}]
+    )
+    return fig
+
+
+@instrument
+def load_world_map_TopFlop(df_temp, projection, scope, color, score="OCoDi"):
     fig = px.choropleth(df_temp,
                         color=color,
                         featureidkey="properties.ISO_A3",
@@ -43,14 +107,135 @@ def load_world_map_TopFlop(df_temp, projection, scope, color):
                         projection=projection,
                         scope=scope,
                         hover_data={'DATE': False,
-                                    'OCoDi': False,
+                                    score: False,
                                     'ISO_A3': False,
                                     'Highest_Lowest': False},
                         labels={
-                            'Highest_Lowest': 'Highest and lowest OCoDi Scores',
-                            'highest': 'Highest OCoDi Scores',
-                            'lowest': 'Lowest OCoDi Scores'
+                            'Highest_Lowest': f'Highest and lowest {score} Scores',
+                            'highest': f'Highest {score} Scores',
+                            'lowest': f'Lowest {score} Scores'
                         }
                         )
     return fig
 
+
+# Above this many points the Country Comparison lines are drawn with WebGL (Scattergl) instead of SVG
+WEBGL_POINTS = 2000
+
+
+@instrument
+def load_country_comparison(df, score):
+    fig = px.line(df,
+                  x="DATE",
+                  y=score,
+                  color="iso3",
+                  render_mode="webgl" if len(df) > WEBGL_POINTS else "svg",
+                  hover_data={
+                      "iso3": False,
+                      "lnFatalities": ":.4f"
+                  },
+                  labels={
+                      "iso3": "ISO-Country Code",
+                      "DATE": "Date"
+                  })
+    return fig
+
+# Figure cache: built figures are kept per (dataset version, scope, projection, color) in memory and
+# their serialized JSON in the data cache folder, so a new process only has to parse instead of rebuild.
+# The cache key covers the source of every module the figures are built from, so cached JSON written by
+# an earlier release is not served after any of them changes.
+FIGURE_SOURCES = [__file__, load_preprocess_data.__file__, rankings.__file__, aggregates.__file__,
+                  data_store.__file__, lists.__file__]
+
+
+def _figure_version(*paths):
+    parts = [dataset_version(path) for path in paths + tuple(FIGURE_SOURCES)] + [plotly.__version__]
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()[:16]
+
+
+def _read_figure_json(cache_path):
+    try:
+        with open(cache_path) as f:
+            return pio.from_json(f.read())
+    except (OSError, ValueError):
+        return None
+
+
+def _write_figure_json(fig, cache_path):
+    payload = fig.to_json()
+
+    def write(tmp_path):
+        with open(tmp_path, "w") as f:
+            f.write(payload)
+    write_cache_file(cache_path, write)
+
+
+def _cached_figure(path, name, version, build):
+    cache_path = cache_file(path, name.replace(" ", "_"), version, ".json")
+    fig = _read_figure_json(cache_path) if os.path.exists(cache_path) else None
+    if fig is None:
+        fig = build()
+        _write_figure_json(fig, cache_path)
+    return fig
+
+
+@shared_resource(max_entries=64)
+def _world_map_fatalities(path_predictions, path_countries, version, projection, scope, color_scale, compact, period):
+    def build():
+        # The shared predictions store, as plain strings so the groupbys only see observed combinations
+        df_predictions = load_predictions(path_predictions).astype({"iso3": str, "yearmon": str})
+        max_fat = round(df_predictions["predicted_fatalities"].max())
+        country_names = load_country_names(path_countries)
+        if compact:
+            return load_world_map_fatalities_compact(df_predictions, "predicted_fatalities", projection, scope,
+                                                     color_scale, country_names, max_fat, period)
+        return load_world_map_fatalities(df_predictions, "predicted_fatalities", projection, scope, color_scale,
+                                         country_names, max_fat)
+    name = f"world_map_fatalities-{scope}-{projection}-{color_scale}"
+    if compact:
+        name = f"{name}-compact_{period or 'all'}"
+    return _cached_figure(path_predictions, name, version, build)
+
+
+@instrument
+def get_world_map_fatalities(path_predictions, path_countries, projection, scope, color_scale, compact=False,
+                             period=None):
+    version = _figure_version(path_predictions, path_countries)
+    return _world_map_fatalities(path_predictions, path_countries, version, projection, scope, color_scale, compact,
+                                 period)
+
+
+@shared_resource(max_entries=32)
+def _world_map_TopFlop(path_full_scaled, path_countries, version, projection, scope, color, year, n, score, stat):
+    def build():
+        df_high_low = create_high_low_list(path_full_scaled, path_countries, year=year, n=n, score=score, stat=stat)
+        return load_world_map_TopFlop(df_high_low, projection, scope, color, score)
+    return _cached_figure(path_full_scaled,
+                          f"world_map_TopFlop-{score}_{stat}-{year}-{n}-{scope}-{projection}-{color}", version, build)
+
+
+@instrument
+def get_world_map_TopFlop(path_full_scaled, path_countries, projection, scope, color, year=2022, n=5, score="OCoDi",
+                          stat="mean"):
+    version = _figure_version(path_full_scaled, path_countries)
+    return _world_map_TopFlop(path_full_scaled, path_countries, version, projection, scope, color, year, n, score,
+                              stat)
+
+
+@instrument
+def prerender_world_maps(path_full_scaled, path_predictions, path_countries, projection="natural earth"):
+    for scope in dict_scope:
+        for period in [None] + load_prediction_periods(path_predictions):
+            get_world_map_fatalities(path_predictions, path_countries, projection, scope, "reds", compact=True,
+                                     period=period)
+    get_world_map_TopFlop(path_full_scaled, path_countries, projection, "world", "Highest_Lowest")
+
+
+if __name__ == "__main__":
+    # Build-time pre-rendering of the map figures into the data cache folder: python -m utils.viz
+    parser = argparse.ArgumentParser(description="Pre-render the world map figures for every region")
+    parser.add_argument("--full-scaled", default="data/full_scaled.csv")
+    parser.add_argument("--predictions", default="data/predictions.csv")
+    parser.add_argument("--countries", default="data/countries.csv")
+    args = parser.parse_args()
+    prerender_world_maps(args.full_scaled, args.predictions, args.countries)
@@ -0,0 +1,63 @@
+import argparse
+import os
+import time
+
+os.environ.setdefault("STREAMLIT_LOGGER_LEVEL", "error")
+
+# Optional warm-up before the app takes traffic. Everything the first session would otherwise build
+# (heavy imports, score store, lookup index, aggregate cube, rankings, score/fatalities correlations, map
+# figures, logo) is loaded
+# up front. Run it as a build/start step to fill the on-disk caches:
+#   python -m utils.warmup
+# or let it start the server in the same process, so the in-memory caches are warm as well:
+#   python -m utils.warmup --serve [streamlit run options]
+
+
+def warm_up(path_full_scaled, path_predictions, path_countries, path_logo):
+    t0 = time.perf_counter()
+    import plotly.express  # noqa: F401
+    from utils.aggregates import load_aggregate_cube
+    from utils.correlations import load_correlation_engine
+    from utils.data_store import load_score_index, load_score_store
+    from utils.general import get_base64_of_bin_file
+    from utils.load_preprocess_data import load_country_names, load_predictions
+    from utils.rankings import load_ranking_engine
+    from utils.viz import prerender_world_maps
+    timings = {"imports": time.perf_counter() - t0}
+
+    steps = [
+        ("score store", lambda: load_score_store(path_full_scaled)),
+        ("score index", lambda: load_score_index(path_full_scaled)),
+        ("aggregate cube", lambda: load_aggregate_cube(path_full_scaled).table("yearly")),
+        ("rankings", lambda: load_ranking_engine(path_full_scaled)),
+        ("correlations", lambda: load_correlation_engine(path_full_scaled)),
+        ("countries and predictions", lambda: (load_country_names(path_countries), load_predictions(path_predictions))),
+        ("map figures", lambda: prerender_world_maps(path_full_scaled, path_predictions, path_countries)),
+        ("logo", lambda: get_base64_of_bin_file(path_logo)),
+    ]
+    for name, func in steps:
+        t0 = time.perf_counter()
+        func()
+        timings[name] = time.perf_counter() - t0
+    return timings
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Pre-populate the app's caches before it takes traffic")
+    parser.add_argument("--full-scaled", default="data/full_scaled.csv")
+    parser.add_argument("--predictions", default="data/predictions.csv")
+    parser.add_argument("--countries", default="data/countries.csv")
+    parser.add_argument("--logo", default="data/images/kompzkfe_logo.png")
+    parser.add_argument("--script", default="StreamlitApp.py")
+    parser.add_argument("--serve", action="store_true", help="start the app in this process after warming up")
+    args, streamlit_args = parser.parse_known_args()
+
+    for name, seconds in warm_up(args.full_scaled, args.predictions, args.countries, args.logo).items():
+        print(f"{name:<28} {seconds * 1000:8.1f} ms")
+    if args.serve:
+        from streamlit.web import cli
+
+        from utils.metrics import start_exporter
+
+        start_exporter()
+        cli.main(["run", args.script, *streamlit_args], prog_name="streamlit")